@@ -0,0 +1,497 @@
+"""Offline benchmark for the download engine
+
+Starts a local fake media server (progressive MP4s with Range support, HLS and
+DASH streams with many fragments, large RSS playlists for yt-dlp's generic
+extractor) and drives main.py's engine without a window: fetch_video_info for
+extraction latency, start_download for downloads at several concurrency settings.
+Reports throughput, job latency, time to first byte, CPU usage and peak RSS.
+
+    python benchmark.py                          # every scenario
+    python benchmark.py --quick                  # smaller sizes, for a fast check
+    python benchmark.py --json results.json      # save the results
+    python benchmark.py --baseline results.json  # compare, exit 1 on regressions
+    python benchmark.py --serve --port 8900      # only run the fake media server
+
+The server runs in its own process so its CPU time and memory don't count
+against the engine. Nothing leaves 127.0.0.1.
+"""
+import os
+import sys
+import re
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MiB = 1024 * 1024
+
+# Sizes per scenario: (normal, --quick)
+SCENARIOS = {
+    'progressive': {'files': (8, 4), 'size': (32 * MiB, 8 * MiB)},
+    'hls': {'streams': (4, 2), 'fragments': (200, 50), 'fragment_size': (256 * 1024, 128 * 1024)},
+    'dash': {'streams': (4, 2), 'fragments': (200, 50), 'fragment_size': (256 * 1024, 128 * 1024)},
+    'playlist': {'items': (100, 30), 'size': (1 * MiB, 256 * 1024)},
+    'info': {'repeat': (5, 3), 'playlist_items': (2000, 500)},
+}
+DEFAULT_CONCURRENCY = [1, 2, 4]
+REGRESSION_TOLERANCE = 0.15
+
+# Fake media server
+PATTERN = random.Random(0).getrandbits(8 * MiB).to_bytes(MiB, 'little')  # Media bodies repeat this block
+
+def write_payload(wfile, offset, length):
+    """Write `length` bytes of the repeated pattern starting at `offset`"""
+    while length > 0:
+        start = offset % len(PATTERN)
+        chunk = PATTERN[start:start + min(length, 64 * 1024)]
+        wfile.write(chunk)
+        offset += len(chunk)
+        length -= len(chunk)
+
+def hls_playlist(fragments):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4', '#EXT-X-MEDIA-SEQUENCE:0']
+    for i in range(fragments):
+        lines += ['#EXTINF:4.0,', f'seg{i}.ts']
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+def dash_manifest(fragments, fragment_size):
+    bandwidth = fragment_size * 8 // 4
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S" mediaPresentationDuration="PT{fragments * 4}S" profiles="urn:mpeg:dash:profile:isoff-live:2011">
+  <Period id="0" start="PT0S">
+    <AdaptationSet mimeType="video/mp4" segmentAlignment="true">
+      <Representation id="720p" codecs="avc1.4d401f,mp4a.40.2" bandwidth="{bandwidth}" width="1280" height="720" frameRate="30">
+        <SegmentTemplate timescale="1" duration="4" startNumber="0" initialization="init.mp4" media="seg$Number$.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+def rss_feed(base, items, size):
+    entries = ''.join(
+        f'<item><title>Item {i}</title><guid>item-{i}</guid>'
+        f'<enclosure url="{base}/video/{size}/item{i}.mp4" type="video/mp4" length="{size}"/>'
+        f'<itunes:duration>00:01:{i % 60:02d}</itunes:duration></item>'
+        for i in range(items)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">'
+        f'<channel><title>Benchmark feed ({items} items)</title>{entries}</channel></rss>'
+    )
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Synthetic media, addressed by path:
+
+    /video/<size>/<name>.mp4                  progressive file (Range supported)
+    /hls/<fragments>/<size>/<name>.m3u8       HLS playlist, fragments at seg<i>.ts
+    /dash/<fragments>/<size>/<name>.mpd       DASH manifest, init.mp4 + seg<i>.m4s
+    /feed/<items>/<size>.rss                  RSS playlist of progressive files
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'BenchMedia/1.0'
+    latency = 0.0  # Seconds added to every response
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request(head=True)
+
+    def do_GET(self):
+        self.handle_request(head=False)
+
+    def handle_request(self, head):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.path.split('?', 1)[0]
+        base = f"http://{self.headers.get('Host')}"
+
+        if m := re.fullmatch(r'/video/(\d+)/[\w-]+\.mp4', path):
+            return self.send_media(int(m[1]), 'video/mp4', head)
+        if m := re.fullmatch(r'/(hls|dash)/(\d+)/(\d+)/(seg(\d+)\.(?:ts|m4s)|init\.mp4)', path):
+            if m[5] is not None and int(m[5]) >= int(m[2]):
+                return self.send_error(404)
+            size = 1024 if m[4] == 'init.mp4' else int(m[3])
+            return self.send_media(size, 'video/MP2T' if m[1] == 'hls' else 'video/iso.segment', head)
+        if m := re.fullmatch(r'/hls/(\d+)/(\d+)/[\w-]+\.m3u8', path):
+            return self.send_text(hls_playlist(int(m[1])), 'application/vnd.apple.mpegurl', head)
+        if m := re.fullmatch(r'/dash/(\d+)/(\d+)/[\w-]+\.mpd', path):
+            return self.send_text(dash_manifest(int(m[1]), int(m[2])), 'application/dash+xml', head)
+        if m := re.fullmatch(r'/feed/(\d+)/(\d+)\.rss', path):
+            return self.send_text(rss_feed(base, int(m[1]), int(m[2])), 'application/rss+xml', head)
+        self.send_error(404)
+
+    def send_text(self, text, content_type, head):
+        data = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def send_media(self, size, content_type, head):
+        start, end = 0, size - 1
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match:
+            start = int(match[1])
+            end = min(int(match[2]) if match[2] else size - 1, size - 1)
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if not head:
+            try:
+                write_payload(self.wfile, start, end - start + 1)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+def serve(port, latency=0.0):
+    MediaHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', port), MediaHandler)
+    server.daemon_threads = True
+    print(f"Serving on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+@contextlib.contextmanager
+def media_server(latency=0.0):
+    """Run the fake server in a child process, yield its base URL"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--port', '0', '--latency', str(latency * 1000)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        line = proc.stdout.readline()
+        match = re.search(r'http://[\d.]+:\d+', line)
+        if not match:
+            raise RuntimeError(f"Media server failed to start: {line!r}")
+        yield match[0]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+# Measurement
+def rss_bytes():
+    """Current resident set size (Linux), or None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class ResourceMonitor:
+    """CPU time and peak RSS of this process while the block runs"""
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_rss = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = rss_bytes()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+
+    def __enter__(self):
+        self.peak_rss = rss_bytes()
+        self._cpu = sum(os.times()[:2])
+        self._wall = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = sum(os.times()[:2]) - self._cpu
+        if self.peak_rss is None:
+            try:
+                import resource
+                # Peak of the whole process so far (kilobytes on Linux)
+                self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            except ImportError:
+                pass
+
+    def report(self):
+        return {
+            'wall_s': round(self.wall, 3),
+            'cpu_s': round(self.cpu, 3),
+            'cpu_pct': round(self.cpu * 100 / self.wall, 1) if self.wall else None,
+            'peak_rss_mib': round(self.peak_rss / MiB, 1) if self.peak_rss else None,
+        }
+
+def percentile(values, q):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+# Engine driver
+def load_engine(workdir):
+    """Import main.py with its app data, downloads and progress events redirected for the benchmark"""
+    os.environ['APPDATA'] = os.path.join(workdir, 'appdata')
+    sys.path.insert(0, BASE_DIR)
+    import main
+    main.download_folder = os.path.join(workdir, 'downloads')
+    main.skip_downloaded = False
+    main.progress_sinks[:] = []  # No window to update
+    main.yt_dlp.load()  # Keep the import out of the first measurement
+    return main
+
+def reset_engine(main):
+    shutil.rmtree(main.download_folder, ignore_errors=True)
+    os.makedirs(main.download_folder, exist_ok=True)
+    main.metadata_cache.clear()
+    main.adaptive_profiles.clear()
+    main.download_queue.clear_finished()
+
+def run_info(main, name, url, repeat):
+    """Cold fetch_video_info latency (metadata cache cleared before each call)"""
+    reset_engine(main)
+    latencies = []
+    failures = 0
+    entries = 0
+    with ResourceMonitor() as monitor:
+        for _ in range(repeat):
+            main.metadata_cache.clear()
+            start = time.perf_counter()
+            result = main.fetch_video_info(url)
+            latencies.append(time.perf_counter() - start)
+            if not result.get('success'):
+                failures += 1
+            entries = result.get('playlist_count') or 0
+    return {
+        'scenario': f'info:{name}',
+        'concurrency': 1,
+        'jobs': repeat,
+        'failed': failures,
+        'entries': entries,
+        'latency_p50_s': round(percentile(latencies, 0.5), 3),
+        'latency_p95_s': round(percentile(latencies, 0.95), 3),
+        **monitor.report(),
+    }
+
+def run_downloads(main, name, urls, concurrency, playlist_mode='single', playlist_workers=1):
+    """Queue every URL at once with `concurrency` queue workers and wait for all of them"""
+    reset_engine(main)
+    main.download_queue.set_max_workers(concurrency)
+    main.playlist_workers = playlist_workers
+    with ResourceMonitor() as monitor:
+        job_ids = [main.start_download(url, 'video', 'Best', playlist_mode) for url in urls]
+        jobs = [main.download_queue.get(job_id) for job_id in job_ids]
+        while any(job.status in ('queued', 'running') for job in jobs):
+            time.sleep(0.02)
+
+    total_bytes = sum(job.metrics['bytes_downloaded'] for job in jobs)
+    latencies = [job.finished_at - job.created_at for job in jobs if job.finished_at]
+    ttfbs = [job.metrics['ttfb'] for job in jobs]
+    result = {
+        'scenario': name,
+        'concurrency': concurrency if playlist_mode == 'single' else playlist_workers,
+        'jobs': len(jobs),
+        'failed': sum(1 for job in jobs if job.status != 'completed'),
+        'mib': round(total_bytes / MiB, 1),
+        'throughput_mib_s': None,
+        'latency_p50_s': round(percentile(latencies, 0.5) or 0, 3),
+        'latency_p95_s': round(percentile(latencies, 0.95) or 0, 3),
+        'ttfb_p50_ms': round(percentile(ttfbs, 0.5) * 1000, 1) if percentile(ttfbs, 0.5) is not None else None,
+        **monitor.report(),
+    }
+    if monitor.wall:
+        result['throughput_mib_s'] = round(total_bytes / MiB / monitor.wall, 1)
+    errors = {job.error for job in jobs if job.error}
+    if errors:
+        print(f"[Bench] {name}: {len(errors)} error(s), e.g. {next(iter(errors))}", file=sys.stderr)
+    return result
+
+def warm_up(main, url, playlist_mode='single'):
+    """One small untimed download, so the first measured run doesn't pay for code loaded on first use"""
+    run_downloads(main, 'warmup', [url], 1, playlist_mode)
+
+def run_benchmarks(main, base, args):
+    size = lambda scenario, key: SCENARIOS[scenario][key][1 if args.quick else 0]
+    concurrency = args.concurrency or DEFAULT_CONCURRENCY
+    results = []
+
+    def record(result):
+        results.append(result)
+        print(f"[Bench] {result['scenario']} x{result['concurrency']}: done in {result['wall_s']}s", file=sys.stderr)
+
+    if 'info' in args.scenarios:
+        repeat = size('info', 'repeat')
+        items = size('info', 'playlist_items')
+        record(run_info(main, 'progressive', f"{base}/video/{MiB}/info.mp4", repeat))
+        record(run_info(main, 'hls', f"{base}/hls/500/{64 * 1024}/info.m3u8", repeat))
+        record(run_info(main, 'dash', f"{base}/dash/500/{64 * 1024}/info.mpd", repeat))
+        record(run_info(main, f'playlist-{items}', f"{base}/feed/{items}/{MiB}.rss", repeat))
+
+    if 'progressive' in args.scenarios:
+        files, file_size = size('progressive', 'files'), size('progressive', 'size')
+        urls = [f"{base}/video/{file_size}/p{i}.mp4" for i in range(files)]
+        warm_up(main, f"{base}/video/{MiB}/warmup.mp4")
+        for workers in concurrency:
+            record(run_downloads(main, 'progressive', urls, workers))
+
+    for kind, ext in (('hls', 'm3u8'), ('dash', 'mpd')):
+        if kind not in args.scenarios:
+            continue
+        streams, fragments, fragment_size = (size(kind, k) for k in ('streams', 'fragments', 'fragment_size'))
+        urls = [f"{base}/{kind}/{fragments}/{fragment_size}/{kind}{i}.{ext}" for i in range(streams)]
+        warm_up(main, f"{base}/{kind}/4/{64 * 1024}/warmup.{ext}")
+        for workers in concurrency:
+            record(run_downloads(main, kind, urls, workers))
+
+    if 'playlist' in args.scenarios:
+        items, item_size = size('playlist', 'items'), size('playlist', 'size')
+        url = f"{base}/feed/{items}/{item_size}.rss"
+        warm_up(main, f"{base}/feed/2/{64 * 1024}.rss", 'all')
+        for workers in concurrency:
+            record(run_downloads(main, 'playlist', [url], 1, 'all', workers))
+
+    return results
+
+# Reporting
+COLUMNS = [
+    ('scenario', 'scenario', 18),
+    ('concurrency', 'conc', 5),
+    ('jobs', 'jobs', 5),
+    ('failed', 'fail', 5),
+    ('mib', 'MiB', 8),
+    ('throughput_mib_s', 'MiB/s', 8),
+    ('latency_p50_s', 'p50 s', 8),
+    ('latency_p95_s', 'p95 s', 8),
+    ('ttfb_p50_ms', 'ttfb ms', 8),
+    ('cpu_pct', 'cpu %', 7),
+    ('peak_rss_mib', 'rss MiB', 8),
+]
+
+def print_table(results, baseline=None):
+    print(' '.join(title.rjust(width) if i else title.ljust(width) for i, (_, title, width) in enumerate(COLUMNS)))
+    for result in results:
+        cells = []
+        for i, (key, _, width) in enumerate(COLUMNS):
+            value = result.get(key)
+            text = '-' if value is None else str(value)
+            cells.append(text.rjust(width) if i else text.ljust(width))
+        line = ' '.join(cells)
+        base = (baseline or {}).get((result['scenario'], result['concurrency']))
+        if base:
+            line += '  ' + describe_change(result, base)
+        print(line)
+
+def describe_change(result, base):
+    changes = []
+    for key, label in (('throughput_mib_s', 'MiB/s'), ('latency_p50_s', 'p50'), ('peak_rss_mib', 'rss')):
+        if result.get(key) and base.get(key):
+            changes.append(f"{label} {(result[key] / base[key] - 1) * 100:+.0f}%")
+    return ', '.join(changes)
+
+def find_regressions(results, baseline, tolerance):
+    """Rows that got slower than the baseline by more than `tolerance`"""
+    regressions = []
+    for result in results:
+        base = baseline.get((result['scenario'], result['concurrency']))
+        if not base:
+            continue
+        if result.get('failed', 0) > base.get('failed', 0):
+            regressions.append(f"{result['scenario']} x{result['concurrency']}: {result['failed']} failed")
+        if result.get('throughput_mib_s') and base.get('throughput_mib_s'):
+            if result['throughput_mib_s'] < base['throughput_mib_s'] * (1 - tolerance):
+                regressions.append(f"{result['scenario']} x{result['concurrency']}: throughput {base['throughput_mib_s']} -> {result['throughput_mib_s']} MiB/s")
+        elif result.get('latency_p50_s') and base.get('latency_p50_s'):
+            if result['latency_p50_s'] > base['latency_p50_s'] * (1 + tolerance):
+                regressions.append(f"{result['scenario']}: latency {base['latency_p50_s']} -> {result['latency_p50_s']} s")
+    return regressions
+
+def load_baseline(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {(r['scenario'], r['concurrency']): r for r in data.get('results', [])}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the download engine against a local fake media server")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', help="Comma-separated worker counts (default 1,2,4)")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes for a fast check")
+    parser.add_argument('--latency', type=float, default=0.0, help="Milliseconds the server waits before each response")
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--baseline', help="Results file from an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE, help="Allowed slowdown vs. the baseline (0.15 = 15%%)")
+    parser.add_argument('--verbose', action='store_true', help="Show the engine's log output")
+    parser.add_argument('--serve', action='store_true', help="Only run the fake media server")
+    parser.add_argument('--port', type=int, default=8900, help="Port for --serve (0 = any free port)")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    if args.concurrency:
+        args.concurrency = [max(1, int(c)) for c in args.concurrency.split(',')]
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve:
+        serve(args.port, args.latency / 1000)
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix='uvd-bench-')
+    try:
+        with media_server(args.latency / 1000) as base:
+            # The engine logs to stdout; keep it for the table
+            log = sys.stderr if args.verbose else open(os.devnull, 'w')
+            with contextlib.redirect_stdout(log):
+                engine = load_engine(workdir)
+                results = run_benchmarks(engine, base, args)
+                engine.cancel_download()
+                engine.stop_logging()  # Flush queued log lines before stdout is restored
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    print_table(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'time': time.time(),
+                'python': sys.version.split()[0],
+                'platform': sys.platform,
+                'cpus': os.cpu_count(),
+                'quick': args.quick,
+                'results': results,
+            }, f, indent=2)
+
+    if baseline:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 1 if any(r['failed'] for r in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
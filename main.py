@@ -1,14 +1,27 @@
+import time
+_startup_start = time.perf_counter()  # Origin of the startup timeline (includes the imports below)
 import eel
-import yt_dlp
+import bottle
 import os
 import sys
 import json
 import threading
 import atexit
 import shutil
-import subprocess
-import urllib.request
-import zipfile
+import importlib
+import uuid
+import heapq
+import bisect
+import itertools
+import copy
+import contextlib
+import hashlib
+import urllib.parse
+import logging
+import logging.handlers
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # App Info
@@ -17,9 +30,50 @@ APP_VERSION = "2.0.0"
 APP_AUTHOR = "Shohan"
 GITHUB_REPO = "shohan-001/universal-video-downloader"
 GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
+GITHUB_NIGHTLY_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/tags/nightly"
 
-# Initialize Eel
-eel.init('web')
+# Startup timeline
+_startup_timeline = []  # {'event', 'at', 'duration'} in seconds since the process started importing
+
+def mark_startup(event, duration=None):
+    """Record a startup milestone (optionally with how long it took)"""
+    entry = {'event': event, 'at': round(time.perf_counter() - _startup_start, 4)}
+    if duration is not None:
+        entry['duration'] = round(duration, 4)
+    _startup_timeline.append(entry)
+
+mark_startup('imports')
+
+# Lazy imports
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+    
+    yt-dlp loads its downloaders, postprocessors and networking stack at import,
+    which is most of the cold start; the window doesn't need any of it.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+    
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    mark_startup(f'import {self._name}', time.perf_counter() - start)
+                    self._module = module
+        return self._module
+    
+    @property
+    def loaded(self):
+        return self._module is not None
+    
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+yt_dlp = LazyModule('yt_dlp')
 
 # Configuration paths
 if getattr(sys, 'frozen', False):
@@ -31,27 +85,212 @@ APPDATA_DIR = os.path.join(os.environ.get('APPDATA', BASE_DIR), APP_NAME)
 os.makedirs(APPDATA_DIR, exist_ok=True)
 CONFIG_FILE = os.path.join(APPDATA_DIR, 'config.json')
 FFMPEG_DIR = os.path.join(APPDATA_DIR, 'ffmpeg')
+HISTORY_DB = os.path.join(APPDATA_DIR, 'history.db')
+JOURNAL_FILE = os.path.join(APPDATA_DIR, 'jobs.journal')
+THUMBNAIL_DIR = os.path.join(APPDATA_DIR, 'thumbnails')
+UPDATE_CACHE_FILE = os.path.join(APPDATA_DIR, 'update_cache.json')
+LOG_DIR = os.path.join(APPDATA_DIR, 'logs')
+LOG_FILE = os.path.join(LOG_DIR, 'app.log')
+
+# Logging
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotated at this size
+LOG_BACKUPS = 5
+_log_context = threading.local()  # job_id of the job the current thread works on
+log = logging.getLogger('uvd')
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line; a leading "[Tag]" in the message becomes the 'tag' field"""
+    def format(self, record):
+        message = record.getMessage()
+        tag = None
+        if message.startswith('[') and '] ' in message[:24]:
+            tag, message = message[1:].split('] ', 1)
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'tag': tag,
+            'msg': message,
+            'job': getattr(record, 'job_id', None),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class ConsoleHandler(logging.StreamHandler):
+    """Plain "[Tag] message" lines on whatever sys.stdout is when the record is written.
+    
+    Headless mode points sys.stdout at stderr after logging starts, and the frozen
+    GUI has no console at all (sys.stdout is None).
+    """
+    def __init__(self):
+        super().__init__(None)
+    
+    def emit(self, record):
+        self.stream = sys.stdout
+        if self.stream is not None:
+            super().emit(record)
+
+class JobContextFilter(logging.Filter):
+    """Stamps records with the job of the thread that logged them (runs on that thread)"""
+    def filter(self, record):
+        record.job_id = getattr(_log_context, 'job_id', None)
+        return True
+
+@contextlib.contextmanager
+def job_log_context(job_id):
+    """Tag everything this thread logs with job_id until the block ends"""
+    outer = getattr(_log_context, 'job_id', None)
+    _log_context.job_id = job_id
+    try:
+        yield
+    finally:
+        _log_context.job_id = outer
+
+_log_listener = None
+
+def setup_logging(level='INFO'):
+    """Route the 'uvd' loggers through a queue to a rotating JSON-lines file and the console.
+    
+    Download threads only put records on the queue; formatting, the file and
+    the console are handled by the listener thread, so a slow console never
+    holds up a download.
+    """
+    global _log_listener
+    if _log_listener:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8', delay=True)
+    file_handler.setFormatter(JsonLogFormatter())
+    console_handler = ConsoleHandler()
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+    console_handler.setLevel(logging.INFO)
+    
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(JobContextFilter())
+    log.addHandler(queue_handler)
+    log.setLevel(level)
+    log.propagate = False
+    _log_listener = logging.handlers.QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Flush queued records (also called before the app exits hard)"""
+    global _log_listener
+    if _log_listener:
+        _log_listener.stop()
+        _log_listener = None
+
+class YtDlpLogger:
+    """Receives yt-dlp's output (passed as its `logger` option) and writes it to the log.
+    
+    Screen messages arrive as debug lines; for a job's tuner, the retries among
+    them ("[download] Got error: ... Retrying") are also counted.
+    """
+    def __init__(self, tuner=None):
+        self.tuner = tuner
+        self._log = logging.getLogger('uvd.yt-dlp')
+    
+    def debug(self, msg):
+        if 'Got error:' in msg:
+            if self.tuner:
+                self.tuner.record_retry()
+            metrics.inc('retries_total')
+            self._log.info(strip_ansi(msg))
+        elif self._log.isEnabledFor(logging.DEBUG):
+            self._log.debug(strip_ansi(msg))
+    
+    def info(self, msg):
+        self._log.info(strip_ansi(msg))
+    
+    def warning(self, msg):
+        self._log.warning(strip_ansi(msg))
+    
+    def error(self, msg):
+        msg = strip_ansi(msg)
+        self._log.error(msg[7:] if msg.startswith('ERROR: ') else msg)
+
+ytdlp_logger = YtDlpLogger()  # For yt-dlp calls that don't belong to a job
+
+LOG_TAIL_BYTES = 512 * 1024  # Read by get_recent_logs
+
+@eel.expose
+def get_recent_logs(limit=200, job_id=None):
+    """Last `limit` records of the log file, optionally only those of one job"""
+    try:
+        with open(LOG_FILE, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - LOG_TAIL_BYTES))
+            lines = f.read().decode('utf-8', 'replace').splitlines()
+    except OSError:
+        return []
+    if size > LOG_TAIL_BYTES:
+        lines = lines[1:]  # Starts mid-record
+    records = []
+    for line in reversed(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if job_id and record.get('job') != job_id:
+            continue
+        records.append(record)
+        if len(records) >= int(limit):
+            break
+    return records[::-1]
+
+@eel.expose
+def set_log_level(level):
+    global log_level
+    level = str(level).upper()
+    if level not in ('DEBUG', 'INFO', 'WARNING', 'ERROR'):
+        return False
+    log_level = level
+    log.setLevel(level)
+    save_config()
+    return True
+
+setup_logging()
 
 # Global variables
 download_folder = str(Path.home() / "Downloads")
 cookies_file = None
-cancel_flag = False
+max_concurrent_downloads = 2  # Jobs downloading at the same time
+playlist_workers = 1  # Playlist items downloaded at the same time per job (1 = sequential)
+progress_update_hz = 8  # Max progress updates per second sent to the UI
+skip_downloaded = True  # Skip videos already in the download history
+dedup_files = False  # Link finished files identical to an earlier download instead of keeping a copy
+bandwidth_limit = 0  # Total bytes per second across all downloads (0 = unlimited)
+adaptive_tuning = True  # Tune fragment concurrency and chunk size per job
+fragment_workers_bounds = [1, 16]  # Min/max fragments downloaded at once (HLS/DASH)
+chunk_size_bounds = [1024 * 1024, 64 * 1024 * 1024]  # Min/max HTTP chunk size in bytes
+adaptive_profiles = {}  # Best settings found per extractor/host
+api_enabled = False  # Serve the HTTP job API
+api_host = '127.0.0.1'
+api_port = 8765
+api_token = None  # Bearer token for the job API (generated when first enabled)
+api_max_queued = 50  # Submissions beyond this many waiting jobs get 429
+thumbnail_cache_mb = 100  # Disk space for cached playlist thumbnails
+log_level = 'INFO'  # DEBUG also records yt-dlp's own messages
+profiling = False  # Sample the stacks of info fetches and download threads (see get_profiler_stats)
+_config_lock = threading.Lock()
+_run_overrides = {}  # Config keys overridden for this run only (headless options) -> value to keep on disk
 _app_closing = False
 
-# Playlist download tracking
-_playlist_current_index = 0
-_playlist_total_count = 0
-_playlist_current_title = ""
-_playlist_entries = []
-
 # Helper function to strip ANSI codes from yt-dlp output
 import re
+ANSI_PATTERN = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 def strip_ansi(text):
     """Remove ANSI escape codes from string"""
     if not text:
         return ""
-    ansi_pattern = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_pattern.sub('', str(text))
+    text = str(text)
+    if '\x1b' not in text:
+        return text
+    return ANSI_PATTERN.sub('', text)
 
 def clean_title(title):
     """Clean up video title by removing social metadata (reactions, comments, etc.)"""
@@ -92,6 +331,7 @@ SUPPORTED_SITES = {
     'music.youtube.com': 'YouTube Music',
     'facebook.com': 'Facebook',
     'fb.watch': 'Facebook',
+    'fb.com': 'Facebook',
     'twitter.com': 'Twitter/X',
     'x.com': 'Twitter/X',
     'instagram.com': 'Instagram',
@@ -113,12 +353,13 @@ SUPPORTED_SITES = {
 }
 
 def force_exit(route=None, sockets=None):
-    print(f"[App] force_exit called! Route: {route}, Sockets: {sockets}")
+    log.info(f"[App] force_exit called! Route: {route}, Sockets: {sockets}")
     global _app_closing
     if _app_closing:
         return
     _app_closing = True
-    print("[App] Exiting...")
+    log.info("[App] Exiting...")
+    stop_logging()
     os._exit(0)
 
 # NOTE: Removed atexit.register(force_exit) - it was causing premature exits
@@ -165,35 +406,283 @@ def find_any_chromium_browser():
 
 # Config management
 def load_config():
-    global download_folder, cookies_file
+    global download_folder, cookies_file, max_concurrent_downloads, playlist_workers, progress_update_hz, skip_downloaded, dedup_files
+    global bandwidth_limit, adaptive_tuning, fragment_workers_bounds, chunk_size_bounds, adaptive_profiles
+    global api_enabled, api_host, api_port, api_token, api_max_queued, thumbnail_cache_mb, profiling, log_level
     try:
         if os.path.exists(CONFIG_FILE):
             with open(CONFIG_FILE, 'r') as f:
                 config = json.load(f)
                 download_folder = config.get('download_folder', str(Path.home() / "Downloads"))
                 cookies_file = config.get('cookies_file', None)
+                max_concurrent_downloads = max(1, int(config.get('max_concurrent_downloads', 2)))
+                playlist_workers = max(1, int(config.get('playlist_workers', 1)))
+                progress_update_hz = max(0.1, float(config.get('progress_update_hz', 8)))
+                skip_downloaded = bool(config.get('skip_downloaded', True))
+                dedup_files = bool(config.get('dedup_files', False))
+                bandwidth_limit = max(0, int(config.get('bandwidth_limit', 0)))
+                adaptive_tuning = bool(config.get('adaptive_tuning', True))
+                fragment_workers_bounds = parse_bounds(config.get('fragment_workers_bounds'), fragment_workers_bounds)
+                chunk_size_bounds = parse_bounds(config.get('chunk_size_bounds'), chunk_size_bounds)
+                adaptive_profiles = dict(config.get('adaptive_profiles') or {})
+                api_enabled = bool(config.get('api_enabled', False))
+                api_host = config.get('api_host', '127.0.0.1')
+                api_port = int(config.get('api_port', 8765))
+                api_token = config.get('api_token') or None
+                api_max_queued = max(1, int(config.get('api_max_queued', 50)))
+                thumbnail_cache_mb = max(1, int(config.get('thumbnail_cache_mb', 100)))
+                profiling = bool(config.get('profiling', False))
+                log_level = str(config.get('log_level', 'INFO')).upper()
+                if log_level not in ('DEBUG', 'INFO', 'WARNING', 'ERROR'):
+                    log_level = 'INFO'
+        download_queue.set_max_workers(max_concurrent_downloads)
+        progress_aggregator.rate_hz = progress_update_hz
+        global_bandwidth.set_rate(bandwidth_limit)
+        thumbnail_cache.max_bytes = thumbnail_cache_mb * 1024 * 1024
+        log.setLevel(log_level)
     except Exception as e:
-        print(f"[Config] Error loading: {e}")
+        log.error(f"[Config] Error loading: {e}")
+
+def parse_bounds(value, default):
+    """Validate a [min, max] pair from the config, falling back to the default"""
+    try:
+        low, high = (int(v) for v in value)
+        if 1 <= low <= high:
+            return [low, high]
+    except (TypeError, ValueError):
+        pass
+    return default
 
 def save_config():
     try:
         config = {
             'download_folder': download_folder,
-            'cookies_file': cookies_file
+            'cookies_file': cookies_file,
+            'max_concurrent_downloads': max_concurrent_downloads,
+            'playlist_workers': playlist_workers,
+            'progress_update_hz': progress_update_hz,
+            'skip_downloaded': skip_downloaded,
+            'dedup_files': dedup_files,
+            'bandwidth_limit': bandwidth_limit,
+            'adaptive_tuning': adaptive_tuning,
+            'fragment_workers_bounds': fragment_workers_bounds,
+            'chunk_size_bounds': chunk_size_bounds,
+            'adaptive_profiles': adaptive_profiles,
+            'api_enabled': api_enabled,
+            'api_host': api_host,
+            'api_port': api_port,
+            'api_token': api_token,
+            'api_max_queued': api_max_queued,
+            'thumbnail_cache_mb': thumbnail_cache_mb,
+            'profiling': profiling,
+            'log_level': log_level
         }
-        with open(CONFIG_FILE, 'w') as f:
+        config.update(_run_overrides)
+        # Jobs save their tuning profiles from worker threads
+        with _config_lock, open(CONFIG_FILE, 'w') as f:
             json.dump(config, f, indent=2)
     except Exception as e:
-        print(f"[Config] Error saving: {e}")
+        log.error(f"[Config] Error saving: {e}")
 
 @eel.expose
 def get_config():
     """Return current config for JavaScript"""
     return {
         'download_folder': download_folder,
-        'cookies_file': cookies_file
+        'cookies_file': cookies_file,
+        'max_concurrent_downloads': max_concurrent_downloads,
+        'playlist_workers': playlist_workers,
+        'progress_update_hz': progress_update_hz,
+        'skip_downloaded': skip_downloaded,
+        'dedup_files': dedup_files,
+        'bandwidth_limit': bandwidth_limit,
+        'adaptive_tuning': adaptive_tuning,
+        'fragment_workers_bounds': fragment_workers_bounds,
+        'chunk_size_bounds': chunk_size_bounds,
+        'thumbnail_cache_mb': thumbnail_cache_mb,
+        'profiling': profiling,
+        'log_level': log_level
     }
 
+# Asset downloads (FFmpeg, app updates)
+ASSET_SEGMENTS = 4  # Parallel ranged requests for large assets
+ASSET_MIN_SEGMENT = 4 * 1024 * 1024  # Smaller downloads use a single stream
+ASSET_CHUNK = 256 * 1024
+ASSET_RETRIES = 5
+ASSET_USER_AGENT = 'Universal-Video-Downloader'
+
+def _asset_request(url, start=None, end=None):
+    import urllib.request
+    headers = {'User-Agent': ASSET_USER_AGENT}
+    if start is not None:
+        headers['Range'] = f"bytes={start}-{'' if end is None else end}"
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def download_asset(url, dest, sha256=None, progress=None, segments=ASSET_SEGMENTS):
+    """Download url to dest with resume, parallel ranged segments and SHA-256 verification.
+    
+    Data goes to dest + '.part'; dest + '.part.json' records the size, validator and
+    how far each segment got, so an interrupted download continues where it stopped
+    (as long as the server still reports the same file). progress(done, total) is
+    called from the download threads.
+    """
+    part_path = dest + '.part'
+    state_path = part_path + '.json'
+    
+    # Probe size, range support and validator with a one-byte range request
+    with _asset_request(url, 0, 0) as response:
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        content_range = response.headers.get('Content-Range', '')
+        if response.status == 206 and '/' in content_range and not content_range.endswith('/*'):
+            total = int(content_range.rsplit('/', 1)[1])
+            ranged = True
+        else:
+            total = int(response.headers.get('Content-Length') or 0)
+            ranged = False
+    
+    state = None
+    if ranged and os.path.exists(part_path) and os.path.exists(state_path):
+        try:
+            with open(state_path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('url') == url and saved.get('size') == total and saved.get('validator') == validator:
+                state = saved
+        except (OSError, ValueError):
+            pass
+    
+    if state is None:
+        count = max(1, min(segments, total // ASSET_MIN_SEGMENT)) if ranged else 1
+        bounds = [total * i // count for i in range(count + 1)]
+        state = {
+            'url': url,
+            'size': total,
+            'validator': validator,
+            'segments': [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)],  # start, end, bytes done
+        }
+        with open(part_path, 'wb') as f:
+            if total:
+                f.truncate(total)
+    else:
+        log.info(f"[Asset] Resuming {os.path.basename(dest)} at {sum(seg[2] for seg in state['segments'])}/{total} bytes")
+    
+    lock = threading.Lock()
+    last_save = [0.0]
+    
+    def save_state(force=False):
+        # Called under lock; the file is small but there's no need to rewrite it every chunk
+        now = time.monotonic()
+        if not ranged or (not force and now - last_save[0] < 1.0):
+            return
+        last_save[0] = now
+        tmp_path = state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+    
+    def report():
+        if progress:
+            progress(sum(seg[2] for seg in state['segments']), total)
+    
+    def fetch_segment(seg):
+        start, end, _ = seg
+        attempt = 0
+        # Unbuffered, so the saved progress never gets ahead of what was written
+        with open(part_path, 'r+b', buffering=0) as f:
+            while not total or seg[2] < end - start + 1:
+                try:
+                    offset = start + seg[2]
+                    with (_asset_request(url, offset, end) if ranged else _asset_request(url)) as response:
+                        if ranged and response.status != 206:
+                            raise IOError(f"Server ignored the range request (HTTP {response.status})")
+                        f.seek(offset)
+                        while True:
+                            block = response.read(ASSET_CHUNK)
+                            if not block:
+                                break
+                            f.write(block)
+                            with lock:
+                                seg[2] += len(block)
+                                save_state()
+                            report()
+                    if not total:
+                        return
+                    if seg[2] < end - start + 1:
+                        raise IOError("Connection closed early")
+                except Exception as e:
+                    attempt += 1
+                    if attempt > ASSET_RETRIES or not ranged:
+                        raise
+                    log.warning(f"[Asset] Segment {start}-{end} failed ({e}), retry {attempt}/{ASSET_RETRIES}")
+                    time.sleep(min(30, 2 ** attempt))
+    
+    pending = [seg for seg in state['segments'] if not total or seg[2] < seg[1] - seg[0] + 1]
+    try:
+        if len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='asset') as pool:
+                for future in [pool.submit(fetch_segment, seg) for seg in pending]:
+                    future.result()
+        elif pending:
+            fetch_segment(pending[0])
+    finally:
+        with lock:
+            save_state(force=True)
+    
+    if sha256:
+        actual = file_sha256(part_path)
+        if actual.lower() != sha256.lower():
+            # A corrupt part file must not be resumed
+            os.remove(part_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            raise ValueError(f"Checksum mismatch for {os.path.basename(dest)}: expected {sha256}, got {actual}")
+    
+    os.replace(part_path, dest)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return dest
+
+def asset_sha256(asset):
+    """SHA-256 of a GitHub release asset, from its 'digest' field (\"sha256:<hex>\")"""
+    digest = (asset or {}).get('digest') or ''
+    return digest.split(':', 1)[1] if digest.startswith('sha256:') else None
+
+def fetch_checksum(checksums_url, filename):
+    """Look up filename in a sha256sum-style checksums file (None if unavailable)"""
+    try:
+        with _asset_request(checksums_url) as response:
+            for line in response.read().decode('utf-8', 'replace').splitlines():
+                parts = line.split()
+                if len(parts) == 2 and parts[1].lstrip('*') == filename:
+                    return parts[0]
+    except Exception as e:
+        log.warning(f"[Asset] Could not get checksums: {e}")
+    return None
+
+def extract_members(zip_path, names, dest_dir):
+    """Extract only the zip members whose file name is in names, flattened into dest_dir"""
+    import zipfile
+    extracted = []
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            name = member.filename.rsplit('/', 1)[-1]
+            if name not in names or member.is_dir():
+                continue
+            target = os.path.join(dest_dir, name)
+            tmp_path = target + '.tmp'
+            # zipfile checks each member's CRC as it is read
+            with zip_ref.open(member) as src, open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, ASSET_CHUNK)
+            os.replace(tmp_path, target)
+            extracted.append(name)
+    return extracted
+
 # FFmpeg functions
 def get_ffmpeg_path():
     ffmpeg_exe = os.path.join(FFMPEG_DIR, 'ffmpeg.exe')
@@ -213,24 +702,28 @@ def install_ffmpeg():
         eel.update_ffmpeg_status("Downloading FFmpeg...")
         os.makedirs(FFMPEG_DIR, exist_ok=True)
         
-        ffmpeg_url = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-win64-gpl.zip"
+        release_url = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest"
+        zip_name = "ffmpeg-master-latest-win64-gpl.zip"
         zip_path = os.path.join(FFMPEG_DIR, "ffmpeg.zip")
         
-        urllib.request.urlretrieve(ffmpeg_url, zip_path)
+        sha256 = fetch_checksum(f"{release_url}/checksums.sha256", zip_name)
+        if not sha256:
+            log.warning("[FFmpeg] No checksum published, skipping verification")
+        
+        last_percent = [-1]
+        def progress(done, total):
+            percent = done * 100 // total if total else 0
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                eel.update_ffmpeg_status(f"Downloading FFmpeg... {percent}%")
+        
+        # Resumes a .part file left by an interrupted attempt
+        download_asset(f"{release_url}/{zip_name}", zip_path, sha256, progress)
         
         eel.update_ffmpeg_status("Extracting...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(FFMPEG_DIR)
-        
-        # Find and move ffmpeg.exe
-        for root, dirs, files in os.walk(FFMPEG_DIR):
-            if 'ffmpeg.exe' in files:
-                for f in ['ffmpeg.exe', 'ffprobe.exe']:
-                    src = os.path.join(root, f)
-                    dst = os.path.join(FFMPEG_DIR, f)
-                    if os.path.exists(src) and src != dst:
-                        shutil.move(src, dst)
-                break
+        extracted = extract_members(zip_path, {'ffmpeg.exe', 'ffprobe.exe'}, FFMPEG_DIR)
+        if 'ffmpeg.exe' not in extracted:
+            raise Exception("ffmpeg.exe not found in the archive")
         
         os.remove(zip_path)
         eel.update_ffmpeg_status("FFmpeg installed!")
@@ -239,6 +732,104 @@ def install_ffmpeg():
         eel.update_ffmpeg_status(f"Error: {str(e)}")
         return False
 
+# Update check cache
+UPDATE_CHECK_INTERVAL = 6 * 3600  # Seconds before GitHub is asked again
+_update_cache_lock = threading.Lock()
+_update_refresh = None  # Background refresh thread
+
+def load_update_cache():
+    try:
+        with open(UPDATE_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_update_cache(cache):
+    with _update_cache_lock:
+        tmp_path = UPDATE_CACHE_FILE + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, UPDATE_CACHE_FILE)
+
+def update_cache_fresh(cache, urls):
+    now = time.time()
+    return all(url in cache and now - cache[url].get('checked', 0) < UPDATE_CHECK_INTERVAL for url in urls)
+
+def slim_release(data):
+    """Keep only the release fields the updater uses"""
+    return {
+        'tag_name': data.get('tag_name', ''),
+        'body': data.get('body', ''),
+        'html_url': data.get('html_url', ''),
+        'assets': [
+            {'name': a.get('name', ''), 'browser_download_url': a.get('browser_download_url'), 'digest': a.get('digest')}
+            for a in data.get('assets', [])
+        ],
+    }
+
+def fetch_release(url, cache, max_age=UPDATE_CHECK_INTERVAL):
+    """Release JSON for a GitHub API url, using cache (dict, updated in place).
+    
+    Entries younger than max_age are returned without a request; older ones are
+    revalidated with If-None-Match/If-Modified-Since, so an unchanged release costs
+    a 304. Returns None if the release doesn't exist; falls back to the cached
+    copy if GitHub can't be reached.
+    """
+    import urllib.request
+    import urllib.error
+    entry = cache.get(url)
+    now = time.time()
+    if entry and now - entry.get('checked', 0) < max_age:
+        return entry.get('data')
+    
+    headers = {'User-Agent': 'Universal-Video-Downloader', 'Accept': 'application/vnd.github+json'}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    elif entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=10) as response:
+            data = slim_release(json.loads(response.read().decode()))
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and entry:
+            entry['checked'] = now
+            return entry.get('data')
+        if e.code == 404:
+            cache[url] = {'data': None, 'checked': now}
+            return None
+        if not entry:
+            raise
+        log.warning(f"[Update] {url} failed ({e}), using cached release")
+        return entry.get('data')
+    except Exception as e:
+        if not entry:
+            raise
+        log.warning(f"[Update] {url} failed ({e}), using cached release")
+        return entry.get('data')
+    
+    cache[url] = {'data': data, 'etag': etag, 'last_modified': last_modified, 'checked': now}
+    return data
+
+def refresh_update_check(check_nightly=True):
+    """Revalidate the cached releases in the background and send the result to the UI"""
+    global _update_refresh
+    
+    def refresh():
+        result = check_for_updates(check_nightly)
+        if result.get('success'):
+            try:
+                eel.update_check_result(result)
+            except Exception as e:
+                log.warning(f"[Update] Could not send update result: {e}")
+    
+    with _update_cache_lock:
+        if _update_refresh is None or not _update_refresh.is_alive():
+            _update_refresh = threading.Thread(target=refresh, daemon=True)
+            _update_refresh.start()
+
 # Exposed functions
 @eel.expose
 def get_app_version():
@@ -249,20 +840,36 @@ def get_app_name():
     return APP_NAME
 
 @eel.expose
-def check_for_updates(check_nightly=True):
-    """Check GitHub for latest release (stable or nightly)"""
+def check_for_updates(check_nightly=True, force=False, background=False):
+    """Check GitHub for latest release (stable or nightly)
+    
+    Answers come from the on-disk cache for UPDATE_CHECK_INTERVAL; force revalidates
+    now. With background=True a stale cache is refreshed on a thread instead and the
+    result is delivered through eel.update_check_result, so the caller never waits.
+    """
     try:
-        import urllib.request
-        import json
+        cache = load_update_cache()
+        urls = [GITHUB_API_URL] + ([GITHUB_NIGHTLY_URL] if check_nightly else [])
         
-        # Check stable release first
-        req = urllib.request.Request(
-            GITHUB_API_URL,
-            headers={'User-Agent': 'Universal-Video-Downloader'}
-        )
+        if background and not force and not update_cache_fresh(cache, urls):
+            refresh_update_check(check_nightly)
+            return {
+                'success': True,
+                'pending': True,
+                'current_version': APP_VERSION,
+                'update_available': False,
+                'is_nightly': False
+            }
         
-        with urllib.request.urlopen(req, timeout=10) as response:
-            stable_data = json.loads(response.read().decode())
+        # Stable and nightly are requested together
+        max_age = 0 if force else UPDATE_CHECK_INTERVAL
+        with ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix='update') as pool:
+            futures = [pool.submit(fetch_release, url, cache, max_age) for url in urls]
+        save_update_cache(cache)
+        
+        stable_data = futures[0].result()
+        if not stable_data:
+            raise Exception("No release found")
         
         stable_version = stable_data.get('tag_name', '').replace('v', '').replace('-universal', '')
         current_version = APP_VERSION
@@ -280,27 +887,23 @@ def check_for_updates(check_nightly=True):
         
         # Find download URL for stable exe
         stable_download_url = None
+        stable_sha256 = None
         for asset in stable_data.get('assets', []):
             if asset['name'].endswith('.exe'):
                 stable_download_url = asset['browser_download_url']
+                stable_sha256 = asset_sha256(asset)
                 break
         
         # Check nightly release if enabled
         nightly_data = None
         nightly_download_url = None
+        nightly_sha256 = None
         nightly_is_newer = False
         nightly_commit = None
         
         if check_nightly:
             try:
-                nightly_url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/tags/nightly"
-                req_nightly = urllib.request.Request(
-                    nightly_url,
-                    headers={'User-Agent': 'Universal-Video-Downloader'}
-                )
-                
-                with urllib.request.urlopen(req_nightly, timeout=10) as response:
-                    nightly_data = json.loads(response.read().decode())
+                nightly_data = futures[1].result()
                 
                 # Get nightly commit from body
                 nightly_body = nightly_data.get('body', '')
@@ -311,6 +914,7 @@ def check_for_updates(check_nightly=True):
                 for asset in nightly_data.get('assets', []):
                     if asset['name'].endswith('.exe'):
                         nightly_download_url = asset['browser_download_url']
+                        nightly_sha256 = asset_sha256(asset)
                         break
                 
                 # Nightly is "newer" only if stable is not newer and we're running a release version
@@ -334,12 +938,13 @@ def check_for_updates(check_nightly=True):
             'latest_version': version_info,
             'update_available': update_available,
             'download_url': download_url,
+            'sha256': stable_sha256 if stable_is_newer else nightly_sha256,
             'release_notes': stable_data.get('body', '') if stable_is_newer else (nightly_data.get('body', '') if nightly_data else ''),
             'release_url': stable_data.get('html_url', '') if stable_is_newer else (nightly_data.get('html_url', '') if nightly_data else ''),
             'is_nightly': is_nightly
         }
     except Exception as e:
-        print(f"[Update] Check failed: {e}")
+        log.warning(f"[Update] Check failed: {e}")
         return {
             'success': False,
             'error': str(e),
@@ -349,26 +954,27 @@ def check_for_updates(check_nightly=True):
         }
 
 @eel.expose
-def download_update(download_url):
-    """Download the update in background"""
+def download_update(download_url, sha256=None):
+    """Download the update in background (verified against sha256 when given)"""
     def download_thread():
         try:
-            import urllib.request
-            
             # Download to temp location
             update_path = os.path.join(APPDATA_DIR, 'update.exe')
             
-            def progress_hook(count, block_size, total_size):
-                percent = int(count * block_size * 100 / total_size) if total_size > 0 else 0
-                eel.update_download_progress(min(percent, 100))
+            last_percent = [-1]
+            def progress(done, total):
+                percent = min(100, done * 100 // total) if total else 0
+                if percent != last_percent[0]:
+                    last_percent[0] = percent
+                    eel.update_download_progress(percent)
             
             eel.update_download_progress(0)
-            urllib.request.urlretrieve(download_url, update_path, progress_hook)
+            download_asset(download_url, update_path, sha256, progress)
             eel.update_download_progress(100)
             
             eel.update_download_complete(True, update_path)
         except Exception as e:
-            print(f"[Update] Download failed: {e}")
+            log.error(f"[Update] Download failed: {e}")
             eel.update_download_complete(False, str(e))
     
     thread = threading.Thread(target=download_thread, daemon=True)
@@ -400,6 +1006,7 @@ def apply_update(update_path):
             f.write(f'del "%~f0"\n')
         
         # Run the batch script and exit
+        import subprocess
         subprocess.Popen(['cmd', '/c', batch_script], 
                         creationflags=subprocess.CREATE_NO_WINDOW)
         
@@ -408,7 +1015,7 @@ def apply_update(update_path):
         
         return {'success': True}
     except Exception as e:
-        print(f"[Update] Apply failed: {e}")
+        log.error(f"[Update] Apply failed: {e}")
         return {'success': False, 'error': str(e)}
 
 @eel.expose
@@ -463,7 +1070,7 @@ def select_cookies_file():
             return {'success': True, 'path': file_path}
         return {'success': False, 'path': ''}
     except Exception as e:
-        print(f"[Error] select_cookies_file: {e}")
+        log.error(f"[Error] select_cookies_file: {e}")
         return {'success': False, 'path': '', 'error': str(e)}
 
 @eel.expose
@@ -491,16 +1098,89 @@ def select_download_folder():
             return {'success': True, 'path': folder_path}
         return {'success': False, 'path': ''}
     except Exception as e:
-        print(f"[Error] select_download_folder: {e}")
+        log.error(f"[Error] select_download_folder: {e}")
         return {'success': False, 'path': '', 'error': str(e)}
 
+# Site detection
+class DomainTrie:
+    """Maps host names to values by their longest matching domain suffix.
+    
+    Labels are stored in reverse ("com" -> "youtube" -> "music"), so a lookup walks
+    the host's labels once: music.youtube.com finds 'music.youtube.com',
+    m.youtube.com falls back to 'youtube.com', and notyoutube.com matches nothing.
+    """
+    def __init__(self, domains=None):
+        self._root = {}
+        for domain, value in (domains or {}).items():
+            self.add(domain, value)
+    
+    def add(self, domain, value):
+        node = self._root
+        for label in reversed(domain.lower().split('.')):
+            node = node.setdefault(label, {})
+        node[None] = (domain, value)  # None can't clash with a label
+    
+    def lookup(self, host):
+        """(domain, value) of the longest suffix of host that was added, or None"""
+        node = self._root
+        found = None
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+site_index = DomainTrie(SUPPORTED_SITES)
+MAX_EXTRACTOR_HOSTS = 2048
+_extractor_hosts = OrderedDict()  # host -> yt-dlp extractor class that matched a URL on it (or None)
+_extractor_hosts_lock = threading.Lock()
+
+def url_host(url):
+    """Lowercase host name of a URL ('' if there is none); scheme-less URLs are accepted"""
+    url = url.strip()
+    if '://' not in url[:12]:
+        url = '//' + url
+    try:
+        host = urllib.parse.urlsplit(url).hostname or ''
+    except ValueError:
+        return ''
+    return host.rstrip('.')
+
+def find_extractor(url, host):
+    """yt-dlp extractor for url, other than the generic one (None if none matches).
+    
+    Only runs once yt-dlp is loaded, so classifying URLs never triggers the import.
+    The full scan over every extractor's _VALID_URL (compiled and cached by yt-dlp
+    on first use) happens once per host; later URLs on the same host only check
+    the extractor found before.
+    """
+    if not yt_dlp.loaded:
+        return None
+    with _extractor_hosts_lock:
+        if host in _extractor_hosts:
+            _extractor_hosts.move_to_end(host)
+            ie = _extractor_hosts[host]
+            if ie is None or ie.suitable(url):
+                return ie
+    ie = next((ie for ie in yt_dlp.extractor.gen_extractor_classes()
+               if ie.ie_key() != 'Generic' and ie.suitable(url)), None)
+    with _extractor_hosts_lock:
+        _extractor_hosts[host] = ie
+        while len(_extractor_hosts) > MAX_EXTRACTOR_HOSTS:
+            _extractor_hosts.popitem(last=False)
+    return ie
+
 @eel.expose
 def detect_site(url):
     """Detect the site from URL and return site info"""
-    url_lower = url.lower()
-    for domain, name in SUPPORTED_SITES.items():
-        if domain in url_lower:
-            return {'detected': True, 'site': name, 'domain': domain}
+    host = url_host(url)
+    match = site_index.lookup(host) if host else None
+    if match:
+        return {'detected': True, 'site': match[1], 'domain': match[0]}
+    ie = find_extractor(url, host) if host else None
+    if ie:
+        return {'detected': True, 'site': ie.IE_NAME.split(':')[0], 'domain': host, 'extractor': ie.ie_key()}
     # For unknown sites, yt-dlp will try to extract anyway
     return {'detected': False, 'site': 'Unknown', 'domain': 'auto-detect'}
 
@@ -509,18 +1189,709 @@ def get_supported_sites():
     """Return list of popular supported sites"""
     return list(set(SUPPORTED_SITES.values()))
 
+# Progress sinks
+class ProgressSink:
+    """Receives download engine events. The GUI and the headless CLI each plug in their own."""
+    def progress(self, updates):
+        """Batched progress: [{job_id, percent, speed, eta, size}]"""
+    
+    def playlist_progress(self, current, total, title, active, job_id):
+        pass
+    
+    def playlist_entries(self, stream_id, entries, offset, done, total, error):
+        pass
+    
+    def playlist_qualities(self, stream_id, qualities):
+        """Quality ladder found by probing a few entries of a streamed playlist"""
+    
+    def complete(self, success, message, job_id):
+        pass
+    
+    def batch_info(self, batch_id, url, info, completed, total):
+        """One URL of a fetch_video_info_batch call was resolved"""
+
+class EelSink(ProgressSink):
+    """Forwards events to the JavaScript handlers of the app window"""
+    def progress(self, updates):
+        eel.update_progress_batch(updates)
+    
+    def playlist_progress(self, current, total, title, active, job_id):
+        eel.update_playlist_progress(current, total, title, active, job_id)
+    
+    def playlist_entries(self, stream_id, entries, offset, done, total, error):
+        eel.update_playlist_entries(stream_id, entries, offset, done, total, error)
+    
+    def playlist_qualities(self, stream_id, qualities):
+        eel.update_playlist_qualities(stream_id, qualities)
+    
+    def complete(self, success, message, job_id):
+        eel.download_complete(success, message, job_id)
+    
+    def batch_info(self, batch_id, url, info, completed, total):
+        eel.update_batch_info(batch_id, url, info, completed, total)
+
+class JsonSink(ProgressSink):
+    """Writes one JSON object per line for every event (headless mode)"""
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+    
+    def write(self, event, **data):
+        line = json.dumps({'event': event, 'time': round(time.time(), 3), **data}, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+    
+    def progress(self, updates):
+        for update in updates:
+            self.write('progress', **update)
+    
+    def playlist_progress(self, current, total, title, active, job_id):
+        self.write('playlist_progress', job_id=job_id, current=current, total=total, title=title, active=active)
+    
+    def complete(self, success, message, job_id):
+        self.write('complete', job_id=job_id, success=success, message=message)
+
+progress_sinks = [EelSink()]
+
+def emit_event(name, *args):
+    """Send an engine event to every registered sink"""
+    for sink in progress_sinks:
+        try:
+            getattr(sink, name)(*args)
+        except Exception as e:
+            log.warning(f"[Sink] {type(sink).__name__}.{name} failed: {e}")
+
+# Thumbnail cache
+THUMB_SIZE = (320, 180)  # Largest thumbnail shown in the UI
+THUMB_MAX_SOURCE_BYTES = 5 * 1024 * 1024
+THUMB_FETCH_WORKERS = 6
+THUMB_MAX_SOURCES = 5000
+THUMB_RETRY_AFTER = 600  # Seconds before a failed thumbnail is fetched again
+
+def downscale_image(data):
+    """Shrink an image to THUMB_SIZE as JPEG (returned unchanged if Pillow is missing)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    import io
+    with Image.open(io.BytesIO(data)) as im:
+        # JPEGs decode straight at a reduced scale, which is most of the saving
+        im.draft('RGB', (THUMB_SIZE[0] * 2, THUMB_SIZE[1] * 2))
+        im.thumbnail(THUMB_SIZE)
+        out = io.BytesIO()
+        im.convert('RGB').save(out, 'JPEG', quality=80, optimize=True)
+    return out.getvalue()
+
+class ThumbnailCache:
+    """Downscaled thumbnails in a size-capped LRU folder (file mtime = last use).
+    
+    The UI gets /thumb/<key> URLs from thumbnail_url(). Only keys handed out by
+    this process know their source URL, so the route can't be used to fetch
+    arbitrary URLs; anything already on disk is served either way.
+    """
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._fetch_slots = threading.BoundedSemaphore(THUMB_FETCH_WORKERS)
+        self._index = None  # key -> size, least recently used first
+        self._total = 0
+        self._sources = OrderedDict()  # key -> source URL
+        self._inflight = {}  # key -> Event set when its fetch ends
+        self._failed = {}  # key -> time of the last failed fetch
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+    
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()[:24]
+    
+    def path(self, key):
+        return os.path.join(self.folder, f'{key}.jpg')
+    
+    def register(self, url):
+        key = self.key_for(url)
+        with self._lock:
+            self._sources[key] = url
+            self._sources.move_to_end(key)
+            while len(self._sources) > THUMB_MAX_SOURCES:
+                self._sources.popitem(last=False)
+        return key
+    
+    def _load_index(self):
+        # Scanned once, on the first thumbnail request
+        if self._index is None:
+            self._index = OrderedDict()
+            os.makedirs(self.folder, exist_ok=True)
+            files = []
+            for entry in os.scandir(self.folder):
+                if entry.name.endswith('.jpg'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            for _, key, size in sorted(files):
+                self._index[key] = size
+                self._total += size
+        return self._index
+    
+    def _read(self, key):
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                return None
+            index.move_to_end(key)
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total -= self._index.pop(key, 0)
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+    
+    def get(self, key):
+        """Return the thumbnail for key, fetching it on a miss (None if unknown or failed)"""
+        data = self._read(key)
+        if data is not None:
+            return data
+        with self._lock:
+            src = self._sources.get(key)
+            if src is None or time.time() - self._failed.get(key, 0) < THUMB_RETRY_AFTER:
+                return None
+            event = self._inflight.get(key)
+            fetching = event is None
+            if fetching:
+                event = self._inflight[key] = threading.Event()
+                self.misses += 1
+        if not fetching:
+            # Same thumbnail requested twice; wait for the first fetch
+            event.wait(30)
+            return self._read(key)
+        try:
+            with self._fetch_slots:
+                data = downscale_image(self._download(src))
+            self._store(key, data)
+            return data
+        except Exception as e:
+            log.warning(f"[Thumbs] {src}: {e}")
+            with self._lock:
+                self.errors += 1
+                if len(self._failed) >= THUMB_MAX_SOURCES:
+                    self._failed.clear()
+                self._failed[key] = time.time()
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+    
+    def _download(self, src):
+        import urllib.request
+        req = urllib.request.Request(src, headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(req, timeout=10) as response:
+            data = response.read(THUMB_MAX_SOURCE_BYTES + 1)
+        if len(data) > THUMB_MAX_SOURCE_BYTES:
+            raise ValueError("image too large")
+        return data
+    
+    def _store(self, key, data):
+        path = self.path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            index = self._load_index()
+            self._total += len(data) - index.pop(key, 0)
+            index[key] = len(data)
+            self._evict()
+    
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+    
+    def clear(self):
+        with self._lock:
+            index = self._load_index()
+            for key in list(index):
+                try:
+                    os.remove(self.path(key))
+                except OSError:
+                    pass
+            index.clear()
+            self._total = 0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._index or ()),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+            }
+
+thumbnail_cache = ThumbnailCache(THUMBNAIL_DIR, thumbnail_cache_mb * 1024 * 1024)
+_thumb_threads = None
+
+def thumbnail_url(src):
+    """Local URL that serves src through the thumbnail cache"""
+    if not src or not src.startswith(('http://', 'https://')):
+        return src or ''
+    return f'/thumb/{thumbnail_cache.register(src)}'
+
+@bottle.route('/thumb/<key:re:[0-9a-f]{24}>')
+def serve_thumbnail(key):
+    global _thumb_threads
+    if _thumb_threads is None:
+        import gevent.threadpool
+        _thumb_threads = gevent.threadpool.ThreadPool(16)
+    # Eel's server runs on gevent without monkey-patching: do the blocking work on a
+    # real thread while this request's greenlet waits, so the UI websocket stays responsive
+    data = _thumb_threads.spawn(thumbnail_cache.get, key).get()
+    if data is None:
+        return bottle.HTTPResponse(status=404)
+    return bottle.HTTPResponse(body=data, headers={
+        'Content-Type': 'image/jpeg',
+        'Cache-Control': 'private, max-age=604800',
+    })
+
+@eel.expose
+def get_thumbnail_cache_stats():
+    return thumbnail_cache.stats()
+
+@eel.expose
+def clear_thumbnail_cache():
+    thumbnail_cache.clear()
+    return True
+
+# Metadata cache
+# Fields of a playlist entry that are cached: what the download (URL, extractor, archive
+# key, file name) and the UI list read. Raw entries carry much more, times thousands.
+CACHED_ENTRY_FIELDS = ('id', 'url', 'ie_key', 'title', 'duration', 'uploader', 'thumbnail')
+
+def compact_entry(e):
+    """Tuple of CACHED_ENTRY_FIELDS for a flat playlist entry (already compact entries are kept)"""
+    if not e or isinstance(e, tuple):
+        return e
+    url = e.get('url')
+    if e.get('_type') not in ('url', 'url_transparent'):
+        # A resolved video is extracted again from its page at download time
+        url = e.get('webpage_url') or e.get('original_url') or url
+    return (e.get('id'), url, e.get('ie_key') or e.get('extractor_key'), e.get('title'),
+            e.get('duration'), e.get('uploader') or e.get('channel'), entry_thumbnail(e))
+
+def expand_entry(entry):
+    """Flat yt-dlp entry rebuilt from compact_entry()"""
+    if not entry:
+        return entry
+    return {'_type': 'url', **dict(zip(CACHED_ENTRY_FIELDS, entry))}
+
+class MetadataCache:
+    """In-process LRU cache of yt-dlp info dicts keyed by normalized URL and cookie identity.
+    
+    Playlist entries are stored compactly (see compact_entry) and rebuilt on get().
+    """
+    # Query parameters that never change what gets extracted
+    TRACKING_PARAMS = {'si', 'feature', 'pp', 'fbclid', 'igshid', 'ref', 'ref_src'}
+    
+    def __init__(self, max_entries=32, ttl=900):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stored_at, info)
+    
+    @classmethod
+    def normalize_url(cls, url):
+        """Canonical form of a URL: lowercase host, no fragment, no tracking params, sorted query"""
+        url = (url or '').strip()
+        try:
+            parts = urllib.parse.urlsplit(url)
+        except ValueError:
+            return url
+        host = parts.netloc.lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+                 if k not in cls.TRACKING_PARAMS and not k.startswith('utm_')]
+        return urllib.parse.urlunsplit((parts.scheme.lower(), host, parts.path.rstrip('/') or '/',
+                                        urllib.parse.urlencode(sorted(query)), ''))
+    
+    @staticmethod
+    def cookie_identity():
+        """Identify the active cookies so a changed cookie file never reuses stale info"""
+        if cookies_file and os.path.exists(cookies_file):
+            return f"{cookies_file}:{os.path.getmtime(cookies_file)}"
+        return None
+    
+    def _key(self, url):
+        return (self.normalize_url(url), self.cookie_identity())
+    
+    def get(self, url):
+        """Return a private copy of the cached info for url, or None"""
+        key = self._key(url)
+        with self._lock:
+            item = self._entries.get(key)
+            if not item:
+                return None
+            stored_at, info = item
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if info.get('_type') == 'playlist' and isinstance(info.get('entries'), list):
+            return {**copy.deepcopy({k: v for k, v in info.items() if k != 'entries'}),
+                    'entries': [expand_entry(e) for e in info['entries']]}
+        # Callers hand the dict to yt-dlp, which mutates it while processing
+        return copy.deepcopy(info)
+    
+    def put(self, url, info):
+        if not info:
+            return
+        if info.get('_type') == 'playlist' and isinstance(info.get('entries'), list):
+            info = {**info, 'entries': [compact_entry(e) for e in info['entries']]}
+        key = self._key(url)
+        with self._lock:
+            self._entries[key] = (time.time(), info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, url):
+        with self._lock:
+            self._entries.pop(self._key(url), None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+metadata_cache = MetadataCache()
+
+def entry_thumbnail(e):
+    """Thumbnail URL reported by yt-dlp for a playlist entry, if any"""
+    return e.get('thumbnail') or (e.get('thumbnails', [{}])[0].get('url') if e.get('thumbnails') else None)
+
+class PlaylistEntry:
+    """Playlist entry as listed in the UI.
+    
+    Playlists can have tens of thousands of entries, so only the fields read from
+    yt-dlp are kept (in slots, sharing the strings of the raw entry); the display
+    fields are derived in to_dict() when a page is sent to the UI.
+    """
+    __slots__ = ('original_index', 'id', 'title', 'duration', 'uploader', '_thumbnail')
+    
+    def __init__(self, original_index, id, title, duration=None, uploader=None, thumbnail=None):
+        self.original_index = original_index
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.uploader = uploader
+        self._thumbnail = thumbnail
+    
+    @classmethod
+    def from_info(cls, e, original_index):
+        """Entry for a flat yt-dlp playlist entry, or None for deleted/private placeholders"""
+        # Only include entries with valid ID and title
+        if not e or not e.get('id'):
+            return None
+        title = e.get('title') or e.get('id', 'Unknown Video')
+        # Skip entries that are just video IDs (placeholders)
+        if not title or title == '[Deleted video]' or title == '[Private video]':
+            return None
+        return cls(original_index, e['id'], title, e.get('duration'),
+                   e.get('uploader') or e.get('channel'), e.get('thumbnail'))
+    
+    @property
+    def duration_str(self):
+        if not self.duration:
+            return None
+        mins, secs = divmod(int(self.duration), 60)
+        return f"{mins}:{secs:02d}"
+    
+    @property
+    def thumbnail(self):
+        return self._thumbnail or f"https://i.ytimg.com/vi/{self.id}/mqdefault.jpg"
+    
+    def to_dict(self, index):
+        thumbnail = self.thumbnail
+        return {
+            'index': index,  # Use actual index in filtered list
+            'original_index': self.original_index,  # Keep original index for yt-dlp
+            'id': self.id,
+            'title': self.title,
+            'duration': self.duration,
+            'duration_str': self.duration_str,
+            'uploader': self.uploader,
+            'thumbnail': thumbnail,
+            'thumbnail_local': thumbnail_url(thumbnail)  # Served from the app's thumbnail cache
+        }
+
+def playlist_page(entries, offset):
+    """UI dicts for a slice of PlaylistEntry objects starting at position offset"""
+    return [entry.to_dict(offset + i) for i, entry in enumerate(entries)]
+
+# Format selection
+DEFAULT_QUALITIES = ['Best', '1080p', '720p', '480p', '360p']  # Offered when a URL's formats are unknown
+QUALITY_PROBE_SAMPLES = 3  # Playlist entries extracted to find the playlist's real qualities
+MAX_FORMAT_PROFILES = 200
+_format_profiles = OrderedDict()  # extractor key -> {'heights': set}
+_format_profiles_lock = threading.Lock()
+
+def format_heights(formats):
+    return {f['height'] for f in formats or [] if f.get('vcodec') != 'none' and f.get('height')}
+
+def quality_ladder(heights):
+    """Quality names offered in the UI for a set of video heights"""
+    qualities = ['Best']
+    for h in sorted(heights, reverse=True):
+        if h >= 2160:
+            qualities.append(f'{h}p (4K)')
+        elif h >= 1440:
+            qualities.append(f'{h}p (2K)')
+        else:
+            qualities.append(f'{h}p')
+    return qualities
+
+def learn_formats(extractor, formats):
+    """Remember the heights an extractor serves, for the quality list of URLs whose
+    own formats are unknown"""
+    # The generic extractor covers unrelated sites, so nothing it sees carries over
+    if not extractor or extractor == 'Generic' or not formats:
+        return
+    with _format_profiles_lock:
+        profile = _format_profiles.pop(extractor, None) or {'heights': set()}
+        profile['heights'] |= format_heights(formats)
+        _format_profiles[extractor] = profile
+        while len(_format_profiles) > MAX_FORMAT_PROFILES:
+            _format_profiles.popitem(last=False)
+
+def format_profile(extractor):
+    with _format_profiles_lock:
+        profile = _format_profiles.get(extractor)
+        return dict(profile) if profile else None
+
+def quality_height(quality):
+    """Height cap of a quality name (e.g., "1080p", "720p (2K)", "720"), None for best"""
+    if quality.lower() == 'best':
+        return None
+    height = ''.join(filter(str.isdigit, quality.split('p')[0].split(' ')[0]))
+    return int(height) if height else None
+
+def format_spec(mode, quality):
+    """yt-dlp format string for a mode and quality name"""
+    if mode == 'audio':
+        # Use bestaudio only - avoid downloading video
+        return 'bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best'
+    height = quality_height(quality)
+    if not height:
+        return 'bestvideo+bestaudio/best'
+    return f'bestvideo[height<={height}]+bestaudio/best[height<={height}]/best'
+
+def sample_entries(entries, count):
+    """Up to count entries spread evenly over the playlist (first and last included)"""
+    entries = [e for e in entries if e and (e.get('url') or e.get('id'))]
+    if len(entries) <= count:
+        return entries
+    step = (len(entries) - 1) / (count - 1)
+    return [entries[round(i * step)] for i in range(count)]
+
+def probe_qualities(entries, ydl_opts):
+    """Heights offered by a few sampled playlist entries (their formats are read, nothing is downloaded)"""
+    def probe(entry):
+        opts = {k: v for k, v in ydl_opts.items() if k not in ('extract_flat', 'playlist_end')}
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(entry.get('url') or entry['id'], ie_key=entry.get('ie_key'), download=False, process=False)
+        formats = (info or {}).get('formats')
+        learn_formats(info.get('extractor_key'), formats)
+        return format_heights(formats)
+    
+    heights = set()
+    sample = sample_entries(entries, QUALITY_PROBE_SAMPLES)
+    with ThreadPoolExecutor(max_workers=max(1, len(sample)), thread_name_prefix='quality-probe') as pool:
+        for future in [pool.submit(probe, e) for e in sample]:
+            try:
+                heights |= future.result()
+            except Exception as e:
+                log.warning(f"[Info] Quality probe failed: {e}")
+    return heights
+
+def known_qualities(extractor):
+    """Qualities seen before for an extractor, or the default list"""
+    profile = format_profile(extractor)
+    if profile and profile['heights']:
+        return quality_ladder(profile['heights'])
+    return DEFAULT_QUALITIES
+
+# Streaming playlist info
+class PlaylistStream:
+    """Reads a playlist's lazy entries in the background and hands them to the UI in pages"""
+    PAGE_SIZE = 50
+    PAGE_INTERVAL = 0.5  # Seconds before a partial page is sent anyway
+    
+    def __init__(self, url, info, ydl, limit=None, ydl_opts=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.info = info
+        self.limit = limit
+        self.ydl_opts = ydl_opts or {}
+        self.entries = []  # PlaylistEntry objects; serialized per page
+        self.qualities = None  # Found by probing the first page's entries
+        self.done = False
+        self.closed = False
+        self.error = None
+        self._ydl = ydl
+        self._lock = threading.Lock()
+    
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def close(self):
+        self.closed = True
+    
+    def page(self, offset=0, limit=100):
+        offset = max(0, int(offset))
+        with self._lock:
+            entries = self.entries[offset:offset + max(1, int(limit))]
+            total = len(self.entries)
+        return {
+            'success': True,
+            'stream_id': self.id,
+            'entries': playlist_page(entries, offset),
+            'offset': offset,
+            'next_offset': offset + len(entries),
+            'total': total,
+            'done': self.done,
+            'error': self.error,
+            'qualities': self.qualities,
+        }
+    
+    def _push(self, offset):
+        with self._lock:
+            page = self.entries[offset:]
+            total = len(self.entries)
+        emit_event('playlist_entries', self.id, playlist_page(page, offset), offset, self.done, total, self.error)
+        return total
+    
+    def _probe(self, entries):
+        heights = probe_qualities(entries, self.ydl_opts)
+        if heights and not self.closed:
+            self.qualities = quality_ladder(heights)
+            emit_event('playlist_qualities', self.id, self.qualities)
+    
+    def _run(self):
+        listed = []  # compact_entry() of every entry, for the download
+        first_page = []  # Raw entries sampled for the quality probe
+        sent = 0
+        last_push = time.monotonic()
+        try:
+            entries = self.info.get('entries') or []
+            if self.limit:
+                entries = itertools.islice(entries, self.limit)
+            
+            for i, e in enumerate(entries):
+                if self.closed:
+                    break
+                listed.append(compact_entry(e))
+                if len(first_page) < self.PAGE_SIZE:
+                    first_page.append(e)
+                entry = PlaylistEntry.from_info(e, i)
+                if entry:
+                    with self._lock:
+                        self.entries.append(entry)
+                
+                pending = len(self.entries) - sent
+                if pending >= self.PAGE_SIZE or (pending and time.monotonic() - last_push >= self.PAGE_INTERVAL):
+                    sent = self._push(sent)
+                    last_push = time.monotonic()
+                if len(listed) == self.PAGE_SIZE:
+                    # The first page is enough to sample; the rest may take minutes to list
+                    threading.Thread(target=self._probe, args=(first_page,), daemon=True).start()
+            
+            log.info(f"[Info] Playlist stream {self.id}: {len(self.entries)} valid of {len(listed)} entries")
+            if len(listed) < self.PAGE_SIZE and not self.closed:
+                threading.Thread(target=self._probe, args=(first_page,), daemon=True).start()
+            if not self.closed:
+                # Make the complete playlist available to the download without another extraction
+                info = {k: v for k, v in self.info.items() if k != 'entries'}
+                info['entries'] = listed
+                metadata_cache.put(self.url, info)
+        except Exception as e:
+            log.error(f"[Error] Playlist stream {self.id}: {e}")
+            self.error = str(e)
+        finally:
+            self.done = True
+            self._ydl.close()
+            self.info = None
+            if not self.closed:
+                self._push(sent)
+
+_playlist_streams = OrderedDict()
+_playlist_streams_lock = threading.Lock()
+MAX_PLAYLIST_STREAMS = 8
+
+def start_playlist_stream(url, info, ydl, limit=None, ydl_opts=None):
+    stream = PlaylistStream(url, info, ydl, limit, ydl_opts)
+    with _playlist_streams_lock:
+        _playlist_streams[stream.id] = stream
+        while len(_playlist_streams) > MAX_PLAYLIST_STREAMS:
+            _, old = _playlist_streams.popitem(last=False)
+            old.close()
+    stream.start()
+    return stream
+
+@eel.expose
+def fetch_playlist_page(stream_id, offset=0, limit=100):
+    """Return up to `limit` entries of a streamed playlist starting at `offset`"""
+    with _playlist_streams_lock:
+        stream = _playlist_streams.get(stream_id)
+    if not stream:
+        return {'success': False, 'error': 'Unknown playlist stream'}
+    return stream.page(offset, limit)
+
+@eel.expose
+def close_playlist_stream(stream_id):
+    """Stop reading a streamed playlist the UI no longer shows"""
+    with _playlist_streams_lock:
+        stream = _playlist_streams.pop(stream_id, None)
+    if stream:
+        stream.close()
+    return stream is not None
+
 @eel.expose
-def fetch_video_info(url):
-    """Fetch video info from any supported site"""
+def fetch_video_info(url, stream=False):
+    """Fetch video info from any supported site
+    
+    With stream=True, playlists return right after the playlist page itself is read;
+    entries follow in pages through update_playlist_entries / fetch_playlist_page.
+    """
+    start = time.perf_counter()
+    with profiler.section('fetch_video_info'):
+        result = _fetch_video_info(url, stream)
+    metrics.observe('extract_seconds', time.perf_counter() - start)
+    metrics.inc('extractions_total', result='ok' if result.get('success') else 'error')
+    return result
+
+def _fetch_video_info(url, stream):
     try:
-        print(f"[Info] Fetching: {url}")
+        log.info(f"[Info] Fetching: {url}")
         
         # Check if this is a YouTube Mix/Radio playlist (dynamically generated)
         is_youtube_mix = 'list=RD' in url or 'list=RDMM' in url
         
         ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
+            'logger': ytdlp_logger,
             'skip_download': True,
             'extract_flat': True,  # Fast extraction
             'socket_timeout': 30,
@@ -529,13 +1900,32 @@ def fetch_video_info(url):
         # Limit YouTube Mix playlists since they're dynamically generated (infinite)
         if is_youtube_mix:
             ydl_opts['playlist_end'] = 50  # Only get first 50 videos
-            print(f"[Info] YouTube Mix detected - limiting to 50 entries")
+            log.info("[Info] YouTube Mix detected - limiting to 50 entries")
         
         if cookies_file and os.path.exists(cookies_file):
             ydl_opts['cookiefile'] = cookies_file
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        playlist_stream = None
+        info = metadata_cache.get(url)
+        if info:
+            log.info("[Info] Using cached metadata")
+        elif stream:
+            # Unprocessed result keeps playlist entries as yt-dlp's lazy generator
+            ydl = yt_dlp.YoutubeDL(ydl_opts)
+            try:
+                info = ydl.extract_info(url, download=False, process=False)
+                if info and info.get('_type') == 'playlist':
+                    playlist_stream = start_playlist_stream(url, info, ydl, 50 if is_youtube_mix else None, ydl_opts)
+                else:
+                    info = ydl.process_ie_result(info, download=False) if info else None
+                    metadata_cache.put(url, info)
+            finally:
+                if not playlist_stream:
+                    ydl.close()
+        else:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+            metadata_cache.put(url, info)
         
         if not info:
             return {'success': False, 'error': 'Could not fetch info'}
@@ -545,60 +1935,35 @@ def fetch_video_info(url):
         entries_data = []
         playlist_thumbnail = None
         
-        if is_playlist:
+        if playlist_stream:
+            log.info(f"[Info] Streaming playlist entries (stream {playlist_stream.id})")
+            playlist_thumbnail = entry_thumbnail(info)
+        elif is_playlist:
             entries = info.get('entries', [])
-            print(f"[Info] Playlist detected with {len(entries)} raw entries")
+            log.info(f"[Info] Playlist detected with {len(entries)} raw entries")
             
             # Get thumbnail from first valid entry if available
             for entry in entries:
                 if entry and entry.get('id'):
-                    playlist_thumbnail = entry.get('thumbnail') or (entry.get('thumbnails', [{}])[0].get('url') if entry.get('thumbnails') else None)
+                    playlist_thumbnail = entry_thumbnail(entry)
                     if playlist_thumbnail:
                         break
             
             # Get all VALID entries (filter out None and placeholder entries)
-            for i, e in enumerate(entries):
-                # Only include entries with valid ID and title
-                if e and e.get('id'):
-                    title = e.get('title') or e.get('id', 'Unknown Video')
-                    # Skip entries that are just video IDs (placeholders)
-                    if title and title != '[Deleted video]' and title != '[Private video]':
-                        # Format duration if available
-                        duration_secs = e.get('duration')
-                        if duration_secs:
-                            mins, secs = divmod(int(duration_secs), 60)
-                            duration_str = f"{mins}:{secs:02d}"
-                        else:
-                            duration_str = None
-                        
-                        entries_data.append({
-                            'index': len(entries_data),  # Use actual index in filtered list
-                            'original_index': i,  # Keep original index for yt-dlp
-                            'id': e.get('id'),
-                            'title': title,
-                            'duration': duration_secs,
-                            'duration_str': duration_str,
-                            'uploader': e.get('uploader') or e.get('channel'),
-                            'thumbnail': e.get('thumbnail') or f"https://i.ytimg.com/vi/{e.get('id')}/mqdefault.jpg"
-                        })
+            valid = (PlaylistEntry.from_info(e, i) for i, e in enumerate(entries))
+            entries_data = playlist_page(filter(None, valid), 0)
             
-            print(f"[Info] Valid playlist entries: {len(entries_data)}")
+            log.info(f"[Info] Valid playlist entries: {len(entries_data)}")
         
-        # Get formats for quality detection
-        available_qualities = ['Best']
+        # Get formats for quality detection; playlists only list their entries, so a few are probed
+        heights = set()
         if 'formats' in info:
-            heights = set()
-            for f in info['formats']:
-                if f.get('vcodec') != 'none' and f.get('height'):
-                    heights.add(f['height'])
-            
-            for h in sorted(list(heights), reverse=True):
-                if h >= 2160:
-                    available_qualities.append(f'{h}p (4K)')
-                elif h >= 1440:
-                    available_qualities.append(f'{h}p (2K)')
-                else:
-                    available_qualities.append(f'{h}p')
+            learn_formats(info.get('extractor_key'), info['formats'])
+            heights = format_heights(info['formats'])
+        elif is_playlist and not playlist_stream:
+            heights = probe_qualities(info.get('entries') or [], ydl_opts)
+        first_entry = next((e for e in info.get('entries') or [] if e), {}) if is_playlist and not playlist_stream else {}
+        available_qualities = quality_ladder(heights) if heights else known_qualities(first_entry.get('ie_key') or info.get('extractor_key'))
         
         # Format duration
         duration_secs = info.get('duration', 0) or 0
@@ -613,275 +1978,2678 @@ def fetch_video_info(url):
         # Detect site
         site_info = detect_site(url)
         
+        playlist_count = len(entries_data)
+        if playlist_stream:
+            # Count reported by the site; the UI updates it as entries arrive
+            playlist_count = info.get('playlist_count') or 0
+        
         result = {
             'success': True,
             'title': info.get('title', 'Unknown'),
             'channel': info.get('channel') or info.get('uploader') or 'Unknown',
             'duration': duration,
             'thumbnail': info.get('thumbnail') or playlist_thumbnail or '',
-            'qualities': available_qualities if len(available_qualities) > 1 else ['Best', '1080p', '720p', '480p', '360p'],
+            'thumbnail_local': thumbnail_url(info.get('thumbnail') or playlist_thumbnail),
+            'qualities': available_qualities if len(available_qualities) > 1 else DEFAULT_QUALITIES,
             'is_playlist': is_playlist,
             'is_mix': is_youtube_mix,  # YouTube Mix/Radio playlist flag
             'playlist_title': info.get('title', '') if is_playlist else '',
-            'playlist_count': len(entries_data) if is_playlist else 0,
+            'playlist_count': playlist_count if is_playlist else 0,
             'entries': entries_data,
+            'stream_id': playlist_stream.id if playlist_stream else None,
             'site': site_info['site'],
             'extractor': info.get('extractor', 'Unknown'),
         }
         
-        print(f"[Info] Site: {result['site']}, Title: {result['title']}")
+        log.info(f"[Info] Site: {result['site']}, Title: {result['title']}")
         return result
         
     except Exception as e:
-        print(f"[Error] fetch_video_info: {e}")
+        log.error(f"[Error] fetch_video_info: {e}")
         return {'success': False, 'error': str(e)}
 
+# Batch info
+BATCH_INFO_WORKERS = 4  # URLs resolved at the same time by fetch_video_info_batch
+_info_batches = {}  # batch_id -> cancel Event of batches still running
+_info_batches_lock = threading.Lock()
+
+def dedupe_urls(urls):
+    """Drop blank and repeated URLs (compared by normalized form), keeping the first spelling"""
+    seen = set()
+    unique = []
+    for url in urls:
+        url = (url or '').strip()
+        if not url:
+            continue
+        key = MetadataCache.normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
 @eel.expose
-def start_download(url, mode='video', quality='Best', playlist_mode='single', selected_indices=None):
-    """Download video/audio from any supported site"""
-    global cancel_flag, _playlist_current_index, _playlist_total_count, _playlist_current_title, _playlist_entries
-    cancel_flag = False
-    _playlist_current_index = 0
-    _playlist_total_count = 0
-    _playlist_current_title = ""
-    _playlist_entries = []
+def fetch_video_info_batch(urls, workers=BATCH_INFO_WORKERS):
+    """Resolve many URLs at once; each result is pushed through update_batch_info as it completes"""
+    unique = dedupe_urls(urls)
+    blank = sum(1 for url in urls if not (url or '').strip())
+    duplicates = len(urls) - blank - len(unique)
+    batch_id = uuid.uuid4().hex[:12]
+    cancel = threading.Event()
+    with _info_batches_lock:
+        _info_batches[batch_id] = cancel
+    log.info(f"[Info] Batch {batch_id}: {len(unique)} URLs ({duplicates} duplicates, {blank} blank)")
     
-    def download_thread():
-        global cancel_flag, _playlist_current_index, _playlist_total_count, _playlist_current_title, _playlist_entries
+    def fetch(url):
+        if cancel.is_set():
+            return url, {'success': False, 'error': 'Cancelled'}
+        return url, fetch_video_info(url)
+    
+    def run():
+        from concurrent.futures import as_completed
+        completed = 0
         try:
-            print(f"[Download] Starting: {url}")
-            print(f"[Download] Mode: {mode}, Quality: {quality}, Playlist Mode: {playlist_mode}")
-            
-            ffmpeg_path = get_ffmpeg_path()
-            target_folder = download_folder
-            
-            # For playlist downloads, create a subfolder with playlist name
-            is_playlist_download = playlist_mode in ['all', 'select']
-            
-            if is_playlist_download:
-                # Fetch playlist info to get title and entries
-                fetch_opts = {
-                    'quiet': True,
-                    'no_warnings': True,
-                    'skip_download': True,
-                    'extract_flat': True,
-                }
+            with ThreadPoolExecutor(max_workers=max(1, min(int(workers), len(unique))), thread_name_prefix=f'info-{batch_id}') as pool:
+                for future in as_completed([pool.submit(fetch, url) for url in unique]):
+                    url, info = future.result()
+                    completed += 1
+                    emit_event('batch_info', batch_id, url, info, completed, len(unique))
+        finally:
+            with _info_batches_lock:
+                _info_batches.pop(batch_id, None)
+    
+    if unique:
+        threading.Thread(target=run, daemon=True, name=f'info-batch-{batch_id}').start()
+    return {'batch_id': batch_id, 'urls': unique, 'duplicates': duplicates, 'blank': blank}
+
+@eel.expose
+def cancel_info_batch(batch_id):
+    """Skip the URLs of a batch that haven't started resolving yet"""
+    with _info_batches_lock:
+        cancel = _info_batches.get(batch_id)
+    if cancel:
+        cancel.set()
+    return cancel is not None
+
+def job_options(options):
+    """Checked (mode, quality, playlist_mode, selected_indices, priority) for start_download
+    from a dict of job options; raises ValueError naming the first invalid field"""
+    mode = options.get('mode', 'video')
+    if mode not in ('video', 'audio'):
+        raise ValueError("'mode' must be 'video' or 'audio'")
+    quality = options.get('quality', 'Best')
+    if not isinstance(quality, str):
+        raise ValueError("'quality' must be a string")
+    playlist_mode = options.get('playlist_mode', 'single')
+    if playlist_mode not in ('single', 'all', 'select'):
+        raise ValueError("'playlist_mode' must be 'single', 'all' or 'select'")
+    selected_indices = options.get('selected_indices')
+    if selected_indices is not None and not (
+            isinstance(selected_indices, list)
+            and all(isinstance(i, int) and not isinstance(i, bool) and i >= 0 for i in selected_indices)):
+        raise ValueError("'selected_indices' must be a list of non-negative integers")
+    try:
+        priority = int(options.get('priority', 0))
+    except (TypeError, ValueError):
+        raise ValueError("'priority' must be an integer")
+    return mode, quality, playlist_mode, selected_indices, priority
+
+@eel.expose
+def start_download_batch(items, defaults=None):
+    """Queue several downloads in one call.
+    
+    items: URLs or {url, mode, quality, playlist_mode, priority} dicts; missing fields come from defaults.
+    Returns [{url, job_id}] in submission order, duplicates dropped. Every item is
+    checked first, so an invalid one raises ValueError before any job is queued.
+    """
+    defaults = defaults or {}
+    items = [{'url': item} if isinstance(item, str) else dict(item) for item in items]
+    wanted = set(dedupe_urls([item.get('url') for item in items]))
+    planned = []
+    for item in items:
+        url = (item.get('url') or '').strip()
+        if url not in wanted:
+            continue
+        wanted.discard(url)
+        options = {**defaults, **{k: v for k, v in item.items() if v is not None}}
+        try:
+            planned.append((url, job_options(options)))
+        except ValueError as e:
+            raise ValueError(f"{url}: {e}")
+    return [{'url': url, 'job_id': start_download(url, *args)} for url, args in planned]
+
+# Download history
+class DownloadArchive:
+    """SQLite record of completed downloads, keyed by extractor, video ID and mode"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+    
+    def _db(self):
+        # Opened on first use so startup never waits on the database
+        if self._conn is None:
+            import sqlite3
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS downloads (
+                    extractor TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    url TEXT,
+                    title TEXT,
+                    output_path TEXT,
+                    size INTEGER,
+                    format TEXT,
+                    completed_at REAL,
+                    PRIMARY KEY (extractor, video_id, mode)
+                )''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS downloads_completed_at ON downloads (completed_at)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS downloads_output_path ON downloads (output_path)')
+            self._conn.commit()
+        return self._conn
+    
+    @staticmethod
+    def key_for(info):
+        """(extractor, video_id) for a full info dict or a flat playlist entry"""
+        extractor = info.get('extractor_key') or info.get('ie_key')
+        video_id = info.get('id')
+        if not extractor or not video_id:
+            return None
+        return extractor.lower(), str(video_id)
+    
+    def contains(self, extractor, video_id, mode):
+        with self._lock:
+            row = self._db().execute(
+                'SELECT output_path FROM downloads WHERE extractor = ? AND video_id = ? AND mode = ?',
+                (extractor.lower(), str(video_id), mode)).fetchone()
+        # A deleted file counts as not downloaded
+        return row is not None and (not row[0] or os.path.exists(row[0]))
+    
+    def has_entry(self, info, mode):
+        key = self.key_for(info) if info else None
+        return key is not None and self.contains(key[0], key[1], mode)
+    
+    def owner_of(self, output_path):
+        """(extractor, video_id) recorded for a file, or None if no download wrote it"""
+        with self._lock:
+            row = self._db().execute(
+                'SELECT extractor, video_id FROM downloads WHERE output_path = ? ORDER BY completed_at DESC LIMIT 1',
+                (output_path,)).fetchone()
+        return tuple(row) if row else None
+    
+    def record(self, info, mode):
+        key = self.key_for(info)
+        if not key:
+            return
+        output_path = info.get('filepath')
+        try:
+            size = os.path.getsize(output_path) if output_path else None
+        except OSError:
+            size = None
+        with self._lock:
+            db = self._db()
+            db.execute(
+                'INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key[0], key[1], mode, info.get('webpage_url') or info.get('original_url'), info.get('title'),
+                 output_path, size, info.get('format_id') or info.get('format'), time.time()))
+            db.commit()
+    
+    def query(self, search='', limit=100, offset=0):
+        sql = 'SELECT extractor, video_id, mode, url, title, output_path, size, format, completed_at FROM downloads'
+        params = []
+        if search:
+            sql += ' WHERE title LIKE ? OR url LIKE ? OR video_id = ?'
+            params += [f'%{search}%', f'%{search}%', search]
+        sql += ' ORDER BY completed_at DESC LIMIT ? OFFSET ?'
+        params += [int(limit), int(offset)]
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+        columns = ['extractor', 'video_id', 'mode', 'url', 'title', 'output_path', 'size', 'format', 'completed_at']
+        return [dict(zip(columns, row)) for row in rows]
+    
+    def remove(self, extractor, video_id, mode=None):
+        with self._lock:
+            db = self._db()
+            if mode:
+                db.execute('DELETE FROM downloads WHERE extractor = ? AND video_id = ? AND mode = ?',
+                           (extractor.lower(), str(video_id), mode))
+            else:
+                db.execute('DELETE FROM downloads WHERE extractor = ? AND video_id = ?', (extractor.lower(), str(video_id)))
+            db.commit()
+    
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.execute('DELETE FROM downloads')
+            db.commit()
+
+class ArchiveView:
+    """Adapter letting yt-dlp's download_archive option consult the history for one mode.
+    
+    yt-dlp checks it with archive IDs ("<extractor> <id>") before extracting entries
+    whose ID is known from the URL, so completed items cost no network requests.
+    Recording happens in the postprocessor hook, which has the output path.
+    """
+    def __init__(self, archive, mode):
+        self.archive = archive
+        self.mode = mode
+    
+    def __contains__(self, archive_id):
+        # yt-dlp asks with None for results it can't build an ID for (e.g. an ID-less playlist)
+        if not archive_id:
+            return False
+        extractor, _, video_id = archive_id.partition(' ')
+        return bool(video_id) and self.archive.contains(extractor, video_id, self.mode)
+    
+    def __bool__(self):
+        return True
+    
+    def add(self, archive_id):
+        pass
+
+download_archive = DownloadArchive(HISTORY_DB)
+
+@eel.expose
+def get_download_history(search='', limit=100, offset=0):
+    """Return completed downloads, newest first"""
+    return download_archive.query(search, limit, offset)
+
+@eel.expose
+def remove_from_download_history(extractor, video_id, mode=None):
+    download_archive.remove(extractor, video_id, mode)
+    return True
+
+@eel.expose
+def clear_download_history():
+    download_archive.clear()
+    return True
+
+@eel.expose
+def set_skip_downloaded(enabled):
+    """Enable or disable skipping videos found in the download history"""
+    global skip_downloaded
+    skip_downloaded = bool(enabled)
+    save_config()
+    return skip_downloaded
+
+# File deduplication
+DEDUP_PARTIAL_BYTES = 64 * 1024  # Read from each end of a file for the quick fingerprint
+FICLONE = 0x40049409  # Linux ioctl that makes a copy-on-write clone (btrfs, XFS)
+
+def partial_hash(path, size):
+    """Fingerprint from the size and both ends of a file; equal files always match"""
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(DEDUP_PARTIAL_BYTES))
+        if size > DEDUP_PARTIAL_BYTES:
+            f.seek(max(DEDUP_PARTIAL_BYTES, size - DEDUP_PARTIAL_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def reflink(src, dst):
+    """Clone src to dst sharing its blocks copy-on-write; False where unsupported"""
+    if not sys.platform.startswith('linux'):
+        return False
+    import fcntl
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(dst)
+        return False
+
+def link_duplicate(src, dst):
+    """Replace dst (identical to src) with a reflink or hard link to src; returns the method or None"""
+    tmp = f'{dst}.dedup'
+    if reflink(src, tmp):
+        method = 'reflink'
+    else:
+        try:
+            os.link(src, tmp)  # Fails across drives
+            method = 'hardlink'
+        except OSError:
+            return None
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        return None
+    return method
+
+class FileIndex:
+    """Fingerprints of finished output files, used to store identical downloads once.
+    
+    Lookups go by (size, partial hash) through an index, so they don't depend on
+    how many files are recorded; the full SHA-256 is only computed for files that
+    share both, and kept for later checks. Lives in the history database.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+    
+    def _db(self):
+        if self._conn is None:
+            import sqlite3
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    partial_hash TEXT NOT NULL,
+                    full_hash TEXT,
+                    linked INTEGER NOT NULL DEFAULT 0
+                )''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS files_fingerprint ON files (size, partial_hash)')
+            self._conn.commit()
+        return self._conn
+    
+    def _execute(self, sql, params=()):
+        with self._lock:
+            db = self._db()
+            rows = db.execute(sql, params).fetchall()
+            db.commit()
+        return rows
+    
+    def _full_hash(self, path, stored=None):
+        if stored:
+            return stored
+        digest = file_sha256(path)
+        self._execute('UPDATE files SET full_hash = ? WHERE path = ?', (digest, path))
+        return digest
+    
+    def find_duplicate(self, path, size, partial):
+        """Recorded file with the same content as path, as (path, full hash of both), or (None, full hash)"""
+        full = None
+        rows = self._execute('SELECT path, mtime, full_hash FROM files WHERE size = ? AND partial_hash = ? AND path != ?',
+                             (size, partial, path))
+        for other, mtime, other_full in rows:
+            try:
+                st = os.stat(other)
+            except OSError:
+                st = None
+            if not st or st.st_size != size or st.st_mtime != mtime:
+                # Deleted or changed since it was recorded
+                self._execute('DELETE FROM files WHERE path = ?', (other,))
+                continue
+            if os.path.samefile(path, other):
+                return other, None
+            full = full or file_sha256(path)
+            if self._full_hash(other, other_full) == full:
+                return other, full
+        return None, full
+    
+    def add(self, path, size, partial, full=None, linked=False):
+        self._execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                      (path, size, os.stat(path).st_mtime, partial, full, int(linked)))
+    
+    def stats(self):
+        files, linked, saved = self._execute(
+            'SELECT COUNT(*), COALESCE(SUM(linked), 0), COALESCE(SUM(CASE WHEN linked THEN size END), 0) FROM files')[0]
+        return {'enabled': dedup_files, 'files': files, 'linked': linked, 'saved_bytes': saved}
+    
+    def clear(self):
+        self._execute('DELETE FROM files')
+
+file_index = FileIndex(HISTORY_DB)
+
+def dedupe_output(path):
+    """Record a finished file and, if an identical one was downloaded before, link to it
+    instead of keeping a second copy. Returns the bytes saved.
+    
+    Best effort: file and index errors are logged, never raised into the download."""
+    import sqlite3
+    try:
+        size = os.path.getsize(path)
+        partial = partial_hash(path, size)
+        other, full = file_index.find_duplicate(path, size, partial)
+        if other and full:
+            method = link_duplicate(other, path)
+            if method:
+                log.info(f"[Dedup] {os.path.basename(path)} is identical to {other}, replaced with a {method}")
+                file_index.add(path, size, partial, full, linked=True)
+                metrics.inc('dedup_saved_bytes_total', size)
+                return size
+        file_index.add(path, size, partial, full)
+    except (OSError, sqlite3.Error) as e:
+        log.warning(f"[Dedup] {path}: {e}")
+    return 0
+
+@eel.expose
+def set_dedup_files(enabled):
+    """Enable or disable linking finished files identical to an earlier download"""
+    global dedup_files
+    dedup_files = bool(enabled)
+    save_config()
+    return dedup_files
+
+@eel.expose
+def get_dedup_stats():
+    return file_index.stats()
+
+# Metrics
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+SPEED_BUCKETS = tuple(1024 * 4 ** n for n in range(3, 10))  # 64 KiB/s .. 256 MiB/s
+SIZE_BUCKETS = tuple(1024 * 1024 * 10 ** n for n in range(5))  # 1 MiB .. 10 GiB
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'extract_seconds': ('histogram', "Time to extract the info of a URL", SECONDS_BUCKETS),
+    'queue_wait_seconds': ('histogram', "Time jobs waited in the queue before starting", SECONDS_BUCKETS),
+    'ttfb_seconds': ('histogram', "Time from starting a file to its first downloaded byte", SECONDS_BUCKETS),
+    'download_speed_bytes': ('histogram', "Average speed of each downloaded file in bytes per second", SPEED_BUCKETS),
+    'file_size_bytes': ('histogram', "Size of each downloaded file", SIZE_BUCKETS),
+    'postprocess_seconds': ('histogram', "Time spent converting each file", SECONDS_BUCKETS),
+    'job_duration_seconds': ('histogram', "Time from a job starting to it finishing", SECONDS_BUCKETS),
+    'extractions_total': ('counter', "Info extractions by result", None),
+    'jobs_total': ('counter', "Finished jobs by status", None),
+    'files_downloaded_total': ('counter', "Files downloaded", None),
+    'bytes_downloaded_total': ('counter', "Bytes downloaded", None),
+    'bytes_on_disk_total': ('counter', "Bytes of finished output files", None),
+    'retries_total': ('counter', "Requests and fragments retried by yt-dlp", None),
+    'dedup_saved_bytes_total': ('counter', "Bytes not stored again because an identical file was linked", None),
+}
+METRICS_PREFIX = 'uvd_'
+
+class Histogram:
+    """Fixed-bucket histogram, cumulative in the Prometheus sense when rendered"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+    
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'avg': round(self.sum / self.count, 3),
+            'p50': round(self.quantile(0.5), 3),
+            'p95': round(self.quantile(0.95), 3),
+            'max': round(self.max, 3),
+        }
+
+class Metrics:
+    """Process-wide counters and histograms (names and buckets in METRICS)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # name -> Histogram
+    
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name, value):
+        if value is None:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+    
+    @staticmethod
+    def _series(name, labels):
+        if not labels:
+            return name
+        return name + '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': {self._series(name, labels): value for (name, labels), value in self._counters.items()},
+                'histograms': {name: h.summary() for name, h in self._histograms.items()},
+            }
+    
+    def prometheus(self, gauges=None):
+        """Text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, _) in METRICS.items():
+                full = METRICS_PREFIX + name
+                if kind == 'counter':
+                    series = [(labels, v) for (n, labels), v in self._counters.items() if n == name]
+                    if not series:
+                        continue
+                    lines += [f"# HELP {full} {help_text}", f"# TYPE {full} counter"]
+                    lines += [f"{self._series(full, labels)} {value}" for labels, value in sorted(series)]
+                else:
+                    histogram = self._histograms.get(name)
+                    if not histogram:
+                        continue
+                    lines += [f"# HELP {full} {help_text}", f"# TYPE {full} histogram"]
+                    cumulative = 0
+                    for bound, n in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += n
+                        lines.append(f'{full}_bucket{{le="{bound}"}} {cumulative}')
+                    lines += [f"{full}_sum {histogram.sum}", f"{full}_count {histogram.count}"]
+        for name, value in (gauges or {}).items():
+            lines += [f"# TYPE {METRICS_PREFIX}{name} gauge", f"{METRICS_PREFIX}{name} {value}"]
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+def runtime_gauges():
+    jobs = download_queue.list()
+    return {
+        'jobs_queued': sum(1 for j in jobs if j.status == 'queued'),
+        'jobs_running': sum(1 for j in jobs if j.status == 'running'),
+        'postprocess_depth': postprocess_pool.stats()['depth'],
+        'thumbnail_cache_bytes': thumbnail_cache.stats()['bytes'],
+    }
+
+def record_file_progress(d, job):
+    """Time to first byte, speed and size of each file, from yt-dlp progress dicts"""
+    filename = d.get('filename')
+    if d['status'] == 'downloading':
+        # 'elapsed' counts from when the downloader started on the file; fragment
+        # downloaders report 0 on their very first update, so wait for a real value
+        if filename in job.files_started or not d.get('downloaded_bytes') or not d.get('elapsed'):
+            return
+        job.files_started.add(filename)
+        ttfb = d['elapsed']
+        metrics.observe('ttfb_seconds', ttfb)
+        with job.lock:
+            if job.metrics['ttfb'] is None:
+                job.metrics['ttfb'] = ttfb
+    elif d['status'] == 'finished' and d.get('elapsed'):
+        # Files that were already on disk finish without 'elapsed'
+        job.files_started.discard(filename)
+        size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+        metrics.inc('files_downloaded_total')
+        metrics.inc('bytes_downloaded_total', size)
+        metrics.observe('file_size_bytes', size)
+        metrics.observe('download_speed_bytes', size / d['elapsed'])
+        with job.lock:
+            job.metrics['files'] += 1
+            job.metrics['bytes_downloaded'] += size
+
+def record_output_file(info, job):
+    try:
+        size = os.path.getsize(info['filepath'])
+    except (KeyError, TypeError, OSError):
+        return
+    metrics.inc('bytes_on_disk_total', size)
+    with job.lock:
+        job.metrics['bytes_on_disk'] += size
+
+@eel.expose
+def get_metrics():
+    """Counters, histogram summaries, gauges and per-job metrics"""
+    data = metrics.snapshot()
+    data['gauges'] = runtime_gauges()
+    data['jobs'] = {job.id: job.to_dict()['metrics'] for job in download_queue.list()}
+    return data
+
+@bottle.route('/metrics')
+def serve_metrics():
+    bottle.response.content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    return metrics.prometheus(runtime_gauges())
+
+# Profiling
+class SamplingProfiler:
+    """Samples the stacks of threads inside a profiled section (only while `profiling` is on).
+    
+    Sections register the thread running them; a background thread reads
+    sys._current_frames() every `interval` seconds and counts each thread's stack
+    under its section. Works with any number of threads profiled at once and
+    costs nothing when profiling is off. dump() writes the folded-stack format
+    read by flamegraph.pl and speedscope.
+    """
+    MAX_STACKS = 20000  # Distinct stacks kept per section
+    
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._threads = {}  # thread ident -> section name
+        self._stacks = {}  # section -> {stack tuple: samples}
+        self._sampler = None
+    
+    @contextlib.contextmanager
+    def section(self, name):
+        if not profiling:
+            yield
+            return
+        ident = threading.get_ident()
+        with self._lock:
+            outer = self._threads.get(ident)
+            self._threads[ident] = name
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._run, daemon=True, name='profiler')
+                self._sampler.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if outer:
+                    self._threads[ident] = outer
+                else:
+                    self._threads.pop(ident, None)
+    
+    def _run(self):
+        own = threading.get_ident()
+        while profiling:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._threads:
+                    continue
+                frames = sys._current_frames()
+                for ident, name in self._threads.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    stack = tuple(reversed(stack))
+                    counts = self._stacks.setdefault(name, {})
+                    if stack not in counts and len(counts) >= self.MAX_STACKS:
+                        stack = ('(other)',)
+                    counts[stack] = counts.get(stack, 0) + 1
+    
+    def stats(self, top=25):
+        """Per section: samples, and the functions with the most samples on top of / anywhere in the stack"""
+        with self._lock:
+            result = {}
+            for name, counts in self._stacks.items():
+                own, total = {}, {}
+                for stack, n in counts.items():
+                    own[stack[-1]] = own.get(stack[-1], 0) + n
+                    for func in set(stack):
+                        total[func] = total.get(func, 0) + n
+                result[name] = {
+                    'samples': sum(counts.values()),
+                    'interval': self.interval,
+                    'self': sorted(own.items(), key=lambda x: -x[1])[:top],
+                    'total': sorted(total.items(), key=lambda x: -x[1])[:top],
+                }
+            return result
+    
+    def dump(self, folder):
+        """Write <section>.folded files and return their paths"""
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        with self._lock:
+            for name, counts in self._stacks.items():
+                path = os.path.join(folder, f"{name}.folded")
+                with open(path, 'w', encoding='utf-8') as f:
+                    for stack, n in counts.items():
+                        f.write(f"{';'.join(stack)} {n}\n")
+                paths.append(path)
+        return paths
+    
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+
+profiler = SamplingProfiler()
+PROFILE_DIR = os.path.join(APPDATA_DIR, 'profiles')
+
+@eel.expose
+def set_profiling(enabled):
+    """Start (with fresh samples) or stop profiling"""
+    global profiling
+    if enabled and not profiling:
+        profiler.reset()
+    profiling = bool(enabled)
+    save_config()
+    return profiling
+
+@eel.expose
+def get_profiler_stats(top=25):
+    return profiler.stats(int(top))
+
+@eel.expose
+def dump_profiler_stats():
+    """Save the samples as folded stacks under the app data folder"""
+    paths = profiler.dump(PROFILE_DIR)
+    log.info(f"[Profile] Wrote {', '.join(paths) or 'nothing'}")
+    return paths
+
+# Post-processing pool
+class PostProcessPool:
+    """Runs ffmpeg post-processing on its own threads so downloads don't wait for it.
+    
+    ffmpeg does the work in a child process, so threads are enough to keep every
+    core busy. At most `max_pending` files may wait or run at once; beyond that,
+    submit() blocks the download thread until a slot frees up.
+    """
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 2
+        self.max_pending = max_pending or self.workers * 2
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._job_futures = {}  # job_id -> futures of that job's files
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._peak_depth = 0
+    
+    def submit(self, job, func, *args):
+        self._slots.acquire()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='postprocess')
+            self._queued += 1
+            self._peak_depth = max(self._peak_depth, self._queued + self._running)
+            future = self._executor.submit(self._run, job, func, *args)
+            self._job_futures.setdefault(job.id, []).append(future)
+        return future
+    
+    def _run(self, job, func, *args):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            if job.cancel_flag:
+                return None
+            with job_log_context(job.id):
+                result = func(*args)
+            succeeded = True
+            return result
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe('postprocess_seconds', elapsed)
+            with job.lock:
+                job.metrics['postprocess_seconds'] += elapsed
+            with self._lock:
+                self._running -= 1
+                if succeeded:
+                    self._completed += 1
+            self._slots.release()
+    
+    def wait_job(self, job):
+        """Block until all files of a job are processed; raise if any failed"""
+        with self._lock:
+            futures = self._job_futures.pop(job.id, [])
+        errors = []
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise Exception(f"Post-processing failed for {len(errors)} file(s): {errors[0]}")
+    
+    def release_job(self, job):
+        """Wait for files a job left behind when it failed or stopped early and log their
+        errors (nothing left after a successful run, which already waited for them)"""
+        try:
+            self.wait_job(job)
+        except Exception as e:
+            log.error(f"[PostProcess] Job {job.id}: {e}")
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'queued': self._queued,
+                'running': self._running,
+                'depth': self._queued + self._running,
+                'peak_depth': self._peak_depth,
+                'completed': self._completed,
+                'failed': self._failed,
+            }
+
+postprocess_pool = PostProcessPool()
+
+@eel.expose
+def get_postprocess_stats():
+    """Depth and concurrency of the post-processing pool"""
+    return postprocess_pool.stats()
+
+def extract_audio(info, ffmpeg_path):
+    """Convert a downloaded file to 320 kbps MP3 and delete the original"""
+    opts = {'logger': ytdlp_logger}
+    if ffmpeg_path:
+        opts['ffmpeg_location'] = ffmpeg_path
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        pp = yt_dlp.postprocessor.FFmpegExtractAudioPP(ydl, preferredcodec='mp3', preferredquality='320')
+        files_to_delete, info = pp.run(info)
+    for path in files_to_delete:
+        try:
+            os.remove(path)
+        except OSError as e:
+            log.warning(f"[PostProcess] Could not delete {path}: {e}")
+    return info
+
+# Download job queue
+class DownloadJob:
+    """State for a single download request (one URL, its options and progress)"""
+    def __init__(self, url, mode='video', quality='Best', playlist_mode='single', selected_indices=None, priority=0, job_id=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.url = url
+        self.mode = mode
+        self.quality = quality
+        self.playlist_mode = playlist_mode
+        self.selected_indices = list(selected_indices) if selected_indices else None
+        self.priority = priority
+        self.status = 'queued'  # queued, running, paused, completed, failed, cancelled
+        self.error = None
+        self.cancel_flag = False
+        self.pause_flag = False
+        self.created_at = time.time()
+        self.queued_at = self.created_at
+        self.started_at = None
+        self.finished_at = None
+        
+        # Playlist tracking
+        self.playlist_current_index = 0
+        self.playlist_total_count = 0
+        self.playlist_current_title = ""
+        self.playlist_title = ""
+        self.playlist_entries = []  # (original_index, entry) pairs
+        self.done_indices = set()  # Playlist items finished by an earlier run of this job
+        self.output_names = {}  # original_index -> planned file name (without extension) of playlist items
+        self.estimated_bytes = None  # Disk space the job was planned to need
+        
+        # Last progress sent to the UI
+        self.progress = {'percent': '0.0%', 'speed': '-', 'eta': '', 'size': ''}
+        
+        # Optional per-job throughput cap and bytes already charged per file
+        self.lock = threading.Lock()
+        self.bandwidth = TokenBucket(0)
+        self.bytes_seen = {}
+        
+        # Fragment concurrency / chunk size, adjusted as files finish
+        self.tuner = DownloadTuner()
+        
+        # Timings and sizes (also counted in the process-wide metrics)
+        self.metrics = {
+            'queue_wait': None,
+            'extract_seconds': None,
+            'ttfb': None,
+            'files': 0,
+            'bytes_downloaded': 0,
+            'bytes_on_disk': 0,
+            'postprocess_seconds': 0.0,
+        }
+        self.files_started = set()  # Files whose first byte was already timed
+    
+    @property
+    def stopped(self):
+        """True once the user asked this job to stop (cancel or pause)"""
+        return self.cancel_flag or self.pause_flag
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'mode': self.mode,
+            'quality': self.quality,
+            'playlist_mode': self.playlist_mode,
+            'selected_indices': self.selected_indices,
+            'priority': self.priority,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'playlist_current_index': self.playlist_current_index,
+            'playlist_total_count': self.playlist_total_count,
+            'playlist_current_title': self.playlist_current_title,
+            'estimated_bytes': self.estimated_bytes,
+            'progress': dict(self.progress),
+            'tuning': self.tuner.stats(),
+            'metrics': dict(self.metrics, retries=self.tuner.retries),
+        }
+
+class DownloadQueue:
+    """Priority queue of download jobs served by a bounded pool of worker threads"""
+    def __init__(self, max_workers=2):
+        self._cond = threading.Condition()
+        self._heap = []  # (-priority, seq, job_id)
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._max_workers = max(1, int(max_workers))
+        self._worker_count = 0
+    
+    def submit(self, job):
+        job_journal.record_submit(job)
+        with self._cond:
+            self._jobs[job.id] = job
+            self._push(job)
+            self._ensure_workers()
+            self._cond.notify()
+        log.info(f"[Queue] Job {job.id} queued (priority {job.priority}): {job.url}")
+        return job.id
+    
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+    
+    def list(self):
+        with self._cond:
+            return list(self._jobs.values())
+    
+    def active_jobs(self):
+        with self._cond:
+            return [j for j in self._jobs.values() if j.status in ('queued', 'running', 'paused')]
+    
+    def pause(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job:
+                return False
+            if job.status == 'queued':
+                job.status = 'paused'
+            elif job.status == 'running':
+                # Worker notices the flag in the progress hook and parks the job
+                job.pause_flag = True
+            else:
+                return False
+            return True
+    
+    def resume(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.status != 'paused':
+                return False
+            job.status = 'queued'
+            job.queued_at = time.time()
+            job.pause_flag = False
+            self._push(job)
+            self._cond.notify()
+            return True
+    
+    def cancel(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.status not in ('queued', 'running', 'paused'):
+                return False
+            job.cancel_flag = True
+            if job.status != 'running':
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                job_journal.record_status(job.id, job.status)
+            return True
+    
+    def set_priority(self, job_id, priority):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job:
+                return False
+            job.priority = int(priority)
+            if job.status == 'queued':
+                # Old heap entry is skipped when popped since its priority no longer matches
+                self._push(job)
+                self._cond.notify()
+            return True
+    
+    def set_max_workers(self, count):
+        with self._cond:
+            self._max_workers = max(1, int(count))
+            if self._jobs:
+                self._ensure_workers()
+            self._cond.notify_all()
+    
+    def clear_finished(self):
+        with self._cond:
+            for job_id in [j.id for j in self._jobs.values() if j.status in ('completed', 'failed', 'cancelled')]:
+                del self._jobs[job_id]
+    
+    def _push(self, job):
+        heapq.heappush(self._heap, (-job.priority, next(self._seq), job.id))
+    
+    def _ensure_workers(self):
+        while self._worker_count < self._max_workers:
+            self._worker_count += 1
+            threading.Thread(target=self._worker, daemon=True).start()
+    
+    def _next_job(self):
+        """Pop the highest priority runnable job, or None if this worker should exit"""
+        with self._cond:
+            while True:
+                if self._worker_count > self._max_workers:
+                    self._worker_count -= 1
+                    return None
+                while self._heap:
+                    neg_priority, _, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    # Skip stale entries (reprioritized, paused, cancelled or removed jobs)
+                    if job and job.status == 'queued' and -neg_priority == job.priority:
+                        job.status = 'running'
+                        job.started_at = time.time()
+                        return job
+                self._cond.wait()
+    
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            _run_download_job(job)
+
+download_queue = DownloadQueue(max_concurrent_downloads)
+
+# Job journal
+class JobJournal:
+    """Append-only log of job parameters and per-item progress, used to resume after a crash.
+    
+    Every record is flushed and fsynced before the work it describes continues, so
+    the journal is never behind what actually finished.
+    """
+    FINISHED = ('completed', 'cancelled', 'failed', 'discarded')
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+    
+    def _write(self, record):
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(json.dumps(record) + '\n')
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                log.warning(f"[Journal] Write failed: {e}")
+    
+    def record_submit(self, job):
+        self._write({'op': 'submit', 'id': job.id, 'job': {
+            'url': job.url,
+            'mode': job.mode,
+            'quality': job.quality,
+            'playlist_mode': job.playlist_mode,
+            'selected_indices': job.selected_indices,
+            'priority': job.priority,
+            'created_at': job.created_at,
+        }})
+    
+    def record_item(self, job_id, index):
+        self._write({'op': 'item', 'id': job_id, 'index': index})
+    
+    def record_status(self, job_id, status):
+        self._write({'op': 'status', 'id': job_id, 'status': status})
+    
+    def load_incomplete(self):
+        """Replay the journal, compact it, and return jobs that never finished"""
+        jobs = OrderedDict()
+        with self._lock:
+            if not os.path.exists(self.path):
+                return []
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash mid-line
+                    job_id = record.get('id')
+                    if record.get('op') == 'submit':
+                        job = jobs.setdefault(job_id, {'id': job_id, 'done_indices': []})
+                        job.update(record['job'])
+                    elif job_id in jobs and record.get('op') == 'item':
+                        jobs[job_id]['done_indices'].append(record['index'])
+                    elif job_id in jobs and record.get('op') == 'status' and record['status'] in self.FINISHED:
+                        del jobs[job_id]
+            
+            # Rewrite with only the unfinished jobs so the file doesn't grow forever
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for job in jobs.values():
+                    params = {k: v for k, v in job.items() if k not in ('id', 'done_indices')}
+                    f.write(json.dumps({'op': 'submit', 'id': job['id'], 'job': params}) + '\n')
+                    for index in job['done_indices']:
+                        f.write(json.dumps({'op': 'item', 'id': job['id'], 'index': index}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            if self._file:
+                self._file.close()
+                self._file = None
+            os.replace(tmp_path, self.path)
+        return list(jobs.values())
+
+job_journal = JobJournal(JOURNAL_FILE)
+_interrupted_jobs = []
+
+@eel.expose
+def get_interrupted_jobs():
+    """Jobs left unfinished when the app last closed"""
+    return _interrupted_jobs
+
+@eel.expose
+def resume_interrupted_jobs(job_ids=None):
+    """Queue interrupted jobs again; finished playlist items are skipped and .part files continue"""
+    global _interrupted_jobs
+    resumed = []
+    for params in _interrupted_jobs:
+        if job_ids and params['id'] not in job_ids:
+            continue
+        job = DownloadJob(params['url'], params.get('mode', 'video'), params.get('quality', 'Best'),
+                          params.get('playlist_mode', 'single'), params.get('selected_indices'),
+                          params.get('priority', 0), job_id=params['id'])
+        job.done_indices = set(params.get('done_indices') or [])
+        download_queue.submit(job)
+        resumed.append(job.id)
+    _interrupted_jobs = [p for p in _interrupted_jobs if p['id'] not in resumed]
+    return resumed
+
+@eel.expose
+def discard_interrupted_jobs():
+    global _interrupted_jobs
+    for params in _interrupted_jobs:
+        job_journal.record_status(params['id'], 'discarded')
+    _interrupted_jobs = []
+    return True
+
+@eel.expose
+def start_download(url, mode='video', quality='Best', playlist_mode='single', selected_indices=None, priority=0):
+    """Queue a video/audio download from any supported site and return its job ID"""
+    job = DownloadJob(url, mode, quality, playlist_mode, selected_indices, priority)
+    return download_queue.submit(job)
+
+@eel.expose
+def list_downloads():
+    """Return all known jobs, most urgent first"""
+    order = {'running': 0, 'queued': 1, 'paused': 2}
+    jobs = sorted(download_queue.list(), key=lambda j: (order.get(j.status, 3), -j.priority, j.created_at))
+    return [j.to_dict() for j in jobs]
+
+@eel.expose
+def get_download(job_id):
+    job = download_queue.get(job_id)
+    return job.to_dict() if job else None
+
+@eel.expose
+def pause_download(job_id):
+    return download_queue.pause(job_id)
+
+@eel.expose
+def resume_download(job_id):
+    return download_queue.resume(job_id)
+
+@eel.expose
+def set_download_priority(job_id, priority):
+    return download_queue.set_priority(job_id, priority)
+
+@eel.expose
+def set_max_concurrent_downloads(count):
+    global max_concurrent_downloads
+    max_concurrent_downloads = max(1, int(count))
+    download_queue.set_max_workers(max_concurrent_downloads)
+    save_config()
+    return max_concurrent_downloads
+
+@eel.expose
+def set_playlist_workers(count):
+    """Set how many playlist items a job downloads at once (1 = sequential)"""
+    global playlist_workers
+    playlist_workers = max(1, int(count))
+    save_config()
+    return playlist_workers
+
+@eel.expose
+def clear_finished_downloads():
+    download_queue.clear_finished()
+    return True
+
+def _run_download_job(job):
+    """Run a job on the current worker thread and record how it ended"""
+    job.metrics['queue_wait'] = job.started_at - job.queued_at
+    metrics.observe('queue_wait_seconds', job.metrics['queue_wait'])
+    try:
+        if job.cancel_flag:
+            job.status = 'cancelled'
+            return
+        with job_log_context(job.id), profiler.section('download'):
+            download_job(job)
+        if job.cancel_flag:
+            job.status = 'cancelled'
+        elif job.pause_flag:
+            job.status = 'paused'
+            job.pause_flag = False
+            log.info(f"[Queue] Job {job.id} paused")
+        else:
+            job.status = 'completed'
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        log.error(f"[Error] Job {job.id}: {e}")
+    finally:
+        postprocess_pool.release_job(job)
+        if job.status != 'paused':
+            job.finished_at = time.time()
+            metrics.observe('job_duration_seconds', job.finished_at - job.started_at)
+        metrics.inc('jobs_total', status=job.status)
+        job_journal.record_status(job.id, job.status)
+
+def download_job(job):
+    """Download video/audio for a single job (runs on a queue worker thread)"""
+    url = job.url
+    mode = job.mode
+    quality = job.quality
+    playlist_mode = job.playlist_mode
+    selected_indices = job.selected_indices
+    try:
+        log.info(f"[Download] Starting: {url}")
+        log.info(f"[Download] Mode: {mode}, Quality: {quality}, Playlist Mode: {playlist_mode}")
+        
+        ffmpeg_path = get_ffmpeg_path()
+        target_folder = download_folder
+        
+        # For playlist downloads, create a subfolder with playlist name
+        is_playlist_download = playlist_mode in ['all', 'select']
+        
+        # Info already extracted by fetch_video_info, reused instead of extracting again
+        cached_info = metadata_cache.get(url)
+        skipped_items = 0
+        
+        if skip_downloaded and not is_playlist_download and download_archive.has_entry(cached_info, mode):
+            log.info(f"[Download] Already downloaded, skipping: {url}")
+            progress_aggregator.complete(job, True, "Already downloaded")
+            return
+        
+        if is_playlist_download:
+            # Fetch playlist info to get title and entries
+            info = cached_info
+            if not info:
+                fetch_opts = {
+                    'logger': job.tuner.logger,
+                    'skip_download': True,
+                    'extract_flat': True,
+                }
                 if cookies_file and os.path.exists(cookies_file):
                     fetch_opts['cookiefile'] = cookies_file
                 
+                start = time.perf_counter()
                 with yt_dlp.YoutubeDL(fetch_opts) as ydl:
                     info = ydl.extract_info(url, download=False)
-                
-                if info and info.get('_type') == 'playlist':
-                    playlist_title = info.get('title', 'Playlist')
-                    entries = info.get('entries', [])
-                    
-                    # If selecting specific indices, filter entries
-                    if playlist_mode == 'select' and selected_indices:
-                        _playlist_entries = [entries[i] for i in selected_indices if i < len(entries)]
-                        _playlist_total_count = len(_playlist_entries)
-                    else:
-                        _playlist_entries = entries
-                        _playlist_total_count = len(entries)
-                    
-                    # Create subfolder for playlist
-                    folder_name = sanitize_folder_name(playlist_title)
-                    target_folder = os.path.join(download_folder, folder_name)
-                    os.makedirs(target_folder, exist_ok=True)
-                    print(f"[Download] Created playlist folder: {target_folder}")
-                    print(f"[Download] Total videos to download: {_playlist_total_count}")
-                    
-                    # Send initial playlist progress
-                    eel.update_playlist_progress(0, _playlist_total_count, "Starting...", True)
-            
-            # Determine if we need title cleaning (only for Facebook/social sites with metadata in title)
-            needs_title_cleaning = any(site in url.lower() for site in ['facebook.com', 'fb.watch', 'fb.com'])
-            
-            if needs_title_cleaning and not is_playlist_download:
-                # Pre-fetch and clean title for Facebook-type sites
-                with yt_dlp.YoutubeDL({'quiet': True, 'skip_download': True, 'noplaylist': True}) as ydl:
-                    try:
-                        info = ydl.extract_info(url, download=False)
-                        raw_title = info.get('title', 'video')
-                        cleaned_title = clean_title(raw_title)
-                        print(f"[Download] Original title: {raw_title[:50]}...")
-                        print(f"[Download] Cleaned title: {cleaned_title}")
-                        outtmpl = os.path.join(target_folder, f'{cleaned_title}.%(ext)s')
-                    except:
-                        outtmpl = os.path.join(target_folder, '%(title).100s.%(ext)s')
-            else:
-                # Use yt-dlp's default title handling
-                outtmpl = os.path.join(target_folder, '%(title).100s.%(ext)s')
+                job.metrics['extract_seconds'] = time.perf_counter() - start
+                metrics.observe('extract_seconds', job.metrics['extract_seconds'])
+                metadata_cache.put(url, info)
             
-            # Progress hook for playlist tracking
-            def playlist_progress_hook(d):
-                global _playlist_current_index, _playlist_current_title
+            if info and info.get('_type') == 'playlist':
+                playlist_title = job.playlist_title = info.get('title', 'Playlist')
+                entries = info.get('entries', [])
                 
-                # Call the main progress hook
-                progress_hook(d)
+                # If selecting specific indices, filter entries (kept as (original_index, entry) pairs)
+                if playlist_mode == 'select' and selected_indices:
+                    job.playlist_entries = [(i, entries[i]) for i in selected_indices if i < len(entries)]
+                else:
+                    job.playlist_entries = list(enumerate(entries))
                 
-                if is_playlist_download and d['status'] == 'downloading':
-                    # Extract current video title from filename if available
-                    filename = d.get('filename', '')
-                    if filename:
-                        base = os.path.basename(filename)
-                        title = os.path.splitext(base)[0].replace('_', ' ')[:50]
-                        if title and title != _playlist_current_title:
-                            _playlist_current_title = title
-                            eel.update_playlist_progress(_playlist_current_index, _playlist_total_count, title, True)
+                # Items finished before the app was closed (resumed job)
+                if job.done_indices:
+                    remaining = [(i, e) for i, e in job.playlist_entries if i not in job.done_indices]
+                    skipped_items = len(job.playlist_entries) - len(remaining)
+                    job.playlist_entries = remaining
                 
-                if is_playlist_download and d['status'] == 'finished':
-                    _playlist_current_index += 1
-                    print(f"[Download] Completed video {_playlist_current_index}/{_playlist_total_count}")
-                    eel.update_playlist_progress(_playlist_current_index, _playlist_total_count, _playlist_current_title, True)
-            
-            # Base options
-            ydl_opts = {
-                'outtmpl': outtmpl,
-                'restrictfilenames': True,  # Replace special chars with underscores
-                'progress_hooks': [playlist_progress_hook],
-                'quiet': True,
-                'no_warnings': True,
-                # Speed optimizations
-                'concurrent_fragment_downloads': 4,  # Download 4 fragments simultaneously
-                'buffersize': 1024 * 16,  # 16KB buffer
-                'http_chunk_size': 1024 * 1024 * 10,  # 10MB chunks
-                'retries': 10,
-                'fragment_retries': 10,
-            }
-            
-            if ffmpeg_path:
-                ydl_opts['ffmpeg_location'] = ffmpeg_path
-            
-            if cookies_file and os.path.exists(cookies_file):
-                ydl_opts['cookiefile'] = cookies_file
+                # Drop items already in the download history before any network work
+                if skip_downloaded:
+                    remaining = [(i, e) for i, e in job.playlist_entries if not download_archive.has_entry(e, mode)]
+                    if len(remaining) < len(job.playlist_entries):
+                        log.info(f"[Download] Skipping {len(job.playlist_entries) - len(remaining)} already downloaded videos")
+                        skipped_items += len(job.playlist_entries) - len(remaining)
+                        job.playlist_entries = remaining
+                job.playlist_total_count = len(job.playlist_entries)
+                
+                if not job.playlist_entries:
+                    emit_event('playlist_progress', 0, 0, "All videos already downloaded", False, job.id)
+                    progress_aggregator.complete(job, True, "All videos were already downloaded")
+                    return
+                
+                # Create subfolder for playlist
+                folder_name = sanitize_folder_name(playlist_title)
+                target_folder = os.path.join(download_folder, folder_name)
+                os.makedirs(target_folder, exist_ok=True)
+                log.info(f"[Download] Created playlist folder: {target_folder}")
+                log.info(f"[Download] Total videos to download: {job.playlist_total_count}")
+                
+                # Send initial playlist progress
+                emit_event('playlist_progress', 0, job.playlist_total_count, "Starting...", True, job.id)
+        
+        # Determine if we need title cleaning (only for Facebook/social sites with metadata in title)
+        needs_title_cleaning = detect_site(url)['site'] == 'Facebook'
+        
+        if needs_title_cleaning and not is_playlist_download:
+            # Pre-fetch and clean title for Facebook-type sites
+            with yt_dlp.YoutubeDL({'logger': job.tuner.logger, 'skip_download': True, 'noplaylist': True}) as ydl:
+                try:
+                    if cached_info and cached_info.get('_type', 'video') == 'video':
+                        info = cached_info
+                    else:
+                        info = ydl.extract_info(url, download=False)
+                    raw_title = info.get('title', 'video')
+                    cleaned_title = clean_title(raw_title)
+                    log.info(f"[Download] Original title: {raw_title[:50]}...")
+                    log.info(f"[Download] Cleaned title: {cleaned_title}")
+                    outtmpl = os.path.join(target_folder, f'{cleaned_title}.%(ext)s')
+                except:
+                    outtmpl = os.path.join(target_folder, '%(title).100s.%(ext)s')
+        else:
+            # Use yt-dlp's default title handling
+            outtmpl = os.path.join(target_folder, '%(title).100s.%(ext)s')
+        
+        # Progress hook for playlist tracking
+        def playlist_progress_hook(d):
+            # Call the main progress hook
+            progress_hook(d, job)
+            limit_bandwidth(d, job)
+            job.tuner.observe(d)
+            record_file_progress(d, job)
             
-            # Playlist handling
-            if playlist_mode == 'single':
-                ydl_opts['noplaylist'] = True
-            elif playlist_mode == 'all':
-                ydl_opts['noplaylist'] = False
-            elif playlist_mode == 'select' and selected_indices:
-                indices = [str(i + 1) for i in selected_indices]
-                ydl_opts['playlist_items'] = ','.join(indices)
+            if is_playlist_download and d['status'] == 'downloading':
+                # Extract current video title from filename if available
+                filename = d.get('filename', '')
+                if filename:
+                    base = os.path.basename(filename)
+                    title = os.path.splitext(base)[0].replace('_', ' ')[:50]
+                    if title and title != job.playlist_current_title:
+                        job.playlist_current_title = title
+                        emit_event('playlist_progress', job.playlist_current_index, job.playlist_total_count, title, True, job.id)
             
-            # Format selection
-            if mode == 'audio':
-                # Use bestaudio only - avoid downloading video
-                ydl_opts['format'] = 'bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best'
-                ydl_opts['extract_audio'] = True
-                ydl_opts['postprocessors'] = [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '320',
-                }]
-            else:
-                # Handle video quality selection
-                if quality.lower() == 'best':
-                    ydl_opts['format'] = 'bestvideo+bestaudio/best'
+            if is_playlist_download and d['status'] == 'finished':
+                job.playlist_current_index += 1
+                log.info(f"[Download] Completed video {job.playlist_current_index}/{job.playlist_total_count}")
+                emit_event('playlist_progress', job.playlist_current_index, job.playlist_total_count, job.playlist_current_title, True, job.id)
+        
+        # Base options
+        ydl_opts = {
+            'outtmpl': outtmpl,
+            'restrictfilenames': True,  # Replace special chars with underscores
+            'progress_hooks': [playlist_progress_hook],
+            'logger': job.tuner.logger,  # yt-dlp output goes to the log; also counts retries for the tuner
+            'noprogress': True,  # Progress is reported through the hooks
+            # Speed optimizations (fragment concurrency and chunk size are set by job.tuner)
+            'buffersize': 1024 * 16,  # 16KB initial buffer, yt-dlp grows it with the speed
+            'retries': 10,
+            'fragment_retries': 10,
+        }
+        job.tuner.apply(ydl_opts)
+        
+        if ffmpeg_path:
+            ydl_opts['ffmpeg_location'] = ffmpeg_path
+        
+        if cookies_file and os.path.exists(cookies_file):
+            ydl_opts['cookiefile'] = cookies_file
+        
+        # Playlist handling
+        if playlist_mode == 'single':
+            ydl_opts['noplaylist'] = True
+        elif playlist_mode == 'all':
+            ydl_opts['noplaylist'] = False
+        elif playlist_mode == 'select' and selected_indices:
+            indices = [str(i + 1) for i in selected_indices]
+            ydl_opts['playlist_items'] = ','.join(indices)
+        
+        if skipped_items:
+            # Only the items left after the history check
+            ydl_opts['playlist_items'] = ','.join(str(i + 1) for i, _ in job.playlist_entries)
+        
+        if skip_downloaded:
+            ydl_opts['download_archive'] = ArchiveView(download_archive, mode)
+        
+        def record_item_done(info):
+            if is_playlist_download and info.get('playlist_index'):
+                job.done_indices.add(info['playlist_index'] - 1)
+                job_journal.record_item(job.id, info['playlist_index'] - 1)
+            learn_formats(info.get('extractor_key'), info.get('formats'))
+            if dedup_files and info.get('filepath'):
+                dedupe_output(info['filepath'])
+            record_output_file(info, job)
+            try:
+                download_archive.record(info, mode)
+            except Exception as e:
+                log.error(f"[Error] Download history: {e}")
+        
+        def convert_audio(info):
+            info = extract_audio(info, ffmpeg_path)
+            if not job.cancel_flag:
+                record_item_done(info)
+        
+        def item_done_hook(d):
+            # MoveFiles is the last step, its info dict has the final output path
+            if d['status'] == 'finished' and d.get('postprocessor') == 'MoveFiles':
+                if mode == 'audio':
+                    # Convert on the post-processing pool while the next item downloads
+                    postprocess_pool.submit(job, convert_audio, dict(d['info_dict']))
                 else:
-                    # Extract numeric height from quality string (e.g., "1080p", "720p (2K)")
-                    height = ''.join(filter(str.isdigit, quality.split('p')[0].split(' ')[0]))
-                    if height:
-                        ydl_opts['format'] = f'bestvideo[height<={height}]+bestaudio/best[height<={height}]/best'
-                    else:
-                        ydl_opts['format'] = 'bestvideo+bestaudio/best'
-                
-                ydl_opts['merge_output_format'] = 'mp4'
-            
+                    record_item_done(d['info_dict'])
+        ydl_opts['postprocessor_hooks'] = [item_done_hook]
+        
+        # Format selection (MP3 conversion runs on the post-processing pool, see item_done_hook)
+        ydl_opts['format'] = format_spec(mode, quality)
+        if mode != 'audio':
+            ydl_opts['merge_output_format'] = 'mp4'
+        
+        # Size and file names are settled before any bandwidth is spent
+        plan_download(job, ydl_opts, target_folder, cached_info)
+        if job.output_names:
+            ydl_opts['outtmpl'] = os.path.join(target_folder, '%(planned_filename)s.%(ext)s')
+        
+        if is_playlist_download and job.playlist_entries and playlist_workers > 1:
+            download_playlist_parallel(job, ydl_opts, playlist_workers)
+        else:
+            download_with_cached_info(job, ydl_opts)
+        
+        # Wait for this job's files still converting
+        postprocess_pool.wait_job(job)
+        job.tuner.save_profile()
+        
+        if not job.stopped:
+            # Send final playlist progress
+            if is_playlist_download:
+                emit_event('playlist_progress', job.playlist_current_index, job.playlist_total_count, "All downloads complete!", False, job.id)
+            progress_aggregator.complete(job, True, "Download completed!")
+        
+    except Exception as e:
+        if not job.stopped:
+            error_msg = str(e)
+            log.error(f"[Error] Download: {error_msg}")
+            progress_aggregator.complete(job, False, error_msg)
+            raise
+
+def download_with_cached_info(job, ydl_opts):
+    """Download job.url, starting from the cached info dict when one is available"""
+    cached_info = metadata_cache.get(job.url)
+    # A video URL fetched as a playlist (or vice versa) can't be reused for this download
+    is_playlist_info = cached_info and cached_info.get('_type') == 'playlist'
+    if cached_info and is_playlist_info == (job.playlist_mode != 'single'):
+        try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+                job.tuner.attach(ydl)
+                attach_output_names(ydl, job)
+                ydl.process_ie_result(cached_info, download=True)
+            return
+        except Exception as e:
+            if job.stopped:
+                raise
+            # Stream URLs in the cached info may have expired - retry with a fresh extraction
+            log.warning(f"[Download] Cached metadata failed ({e}), extracting again")
+            metadata_cache.invalidate(job.url)
+    
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        job.tuner.attach(ydl)
+        attach_output_names(ydl, job)
+        ydl.download([job.url])
+
+def download_playlist_parallel(job, ydl_opts, workers):
+    """Download the resolved playlist entries of a job with up to `workers` items at once"""
+    items = [(i, e) for i, e in job.playlist_entries if e]
+    log.info(f"[Download] Parallel playlist download: {len(items)} items, {workers} workers")
+    
+    lock = threading.Lock()
+    active = {}  # original_index -> latest progress dict of that item
+    failures = []
+    
+    # One YoutubeDL per worker thread, reused for its items (building one costs ~80 ms of CPU)
+    item_opts = dict(ydl_opts)
+    item_opts.pop('playlist_items', None)
+    item_opts['noplaylist'] = True
+    local = threading.local()
+    ydls = []
+    
+    def report_progress():
+        # Roll the active items up into one progress update for the job
+        downloaded = sum(d.get('downloaded_bytes') or 0 for d in active.values())
+        total = sum(d.get('total_bytes') or d.get('total_bytes_estimate') or 0 for d in active.values())
+        speed = sum(d.get('speed') or 0 for d in active.values())
+        etas = [d.get('eta') for d in active.values() if d.get('eta')]
+        progress_hook({
+            'status': 'downloading',
+            'downloaded_bytes': downloaded,
+            'total_bytes': total,
+            'speed': speed,
+            'eta': max(etas) if etas else None,
+        }, job)
+    
+    def item_hook(index, d):
+        if job.stopped:
+            raise yt_dlp.utils.DownloadCancelled("Download cancelled by user")
+        limit_bandwidth(d, job)
+        job.tuner.observe(d)
+        record_file_progress(d, job)
+        if d['status'] != 'downloading':
+            return
+        with lock:
+            active[index] = d
+            report_progress()
+            # Show the earliest item still in flight as the current title
+            if min(active) == index and d.get('filename'):
+                title = os.path.splitext(os.path.basename(d['filename']))[0].replace('_', ' ')[:50]
+                if title != job.playlist_current_title:
+                    job.playlist_current_title = title
+                    emit_event('playlist_progress', job.playlist_current_index, job.playlist_total_count, title, True, job.id)
+    
+    def worker_ydl():
+        if not hasattr(local, 'ydl'):
+            state = local.state = {'index': None}
+            local.ydl = yt_dlp.YoutubeDL({**item_opts, 'progress_hooks': [lambda d: item_hook(state['index'], d)]})
+            job.tuner.attach(local.ydl)
+            # Files are named by playlist_index, planned up front so concurrent items never write the same file
+            attach_output_names(local.ydl, job)
+            with lock:
+                ydls.append(local.ydl)
+        return local.ydl, local.state
+    
+    def download_item(index, entry):
+        if job.stopped:
+            return
+        
+        ydl, state = worker_ydl()
+        state['index'] = index
+        # As in yt-dlp's playlist loop; playlist_index names the file and lets
+        # record_item_done mark the item done once the file is final
+        extra_info = {'playlist': job.playlist_title, 'playlist_index': index + 1}
+        try:
+            if entry.get('_type') in ('url', 'url_transparent'):
+                # Resolve the flat entry like yt-dlp's own playlist loop does (keeps playlist titles)
+                ydl.process_ie_result(dict(entry), download=True, extra_info=extra_info)
+            else:
+                ydl.extract_info(entry.get('webpage_url') or entry.get('url') or entry.get('id'), extra_info=extra_info)
+        except Exception as e:
+            if not job.stopped:
+                log.error(f"[Error] Playlist item {index + 1}: {e}")
+                with lock:
+                    failures.append(index)
+            return
+        finally:
+            with lock:
+                active.pop(index, None)
+        
+        if job.stopped:
+            return
+        with lock:
+            job.playlist_current_index += 1
+            log.info(f"[Download] Completed video {job.playlist_current_index}/{job.playlist_total_count}")
+            emit_event('playlist_progress', job.playlist_current_index, job.playlist_total_count, job.playlist_current_title, True, job.id)
+    
+    def run_item(index, entry):
+        with job_log_context(job.id), profiler.section('download'):
+            download_item(index, entry)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'playlist-{job.id}') as pool:
+            # Submitted in playlist order so items start in the same order as a sequential run
+            for index, entry in items:
+                pool.submit(run_item, index, entry)
+    finally:
+        for ydl in ydls:
+            ydl.close()
+    
+    if failures and not job.stopped:
+        raise Exception(f"{len(failures)} of {len(items)} playlist items failed")
+
+# Download planning
+PLAN_RESERVE_BYTES = 256 * 1024 * 1024  # Free space always left on the download drive
+PLAN_MARGIN = 1.1  # Sizes are estimates; ask for 10% more
+PLAN_GUESS_SLACK = 3  # Guessed sizes fail a job only if a third of them still doesn't fit
+# Bytes per second assumed for entries without format sizes (flat playlist entries)
+AUDIO_BYTES_PER_SEC = 160 * 1024 // 8
+VIDEO_BYTES_PER_SEC = ((360, 100_000), (480, 160_000), (720, 320_000), (1080, 640_000), (1440, 1_300_000), (2160, 2_600_000))
+OUTPUT_EXTS = {'video': ('mp4', 'webm', 'mkv'), 'audio': ('mp3', 'm4a', 'webm', 'opus')}
+
+def typical_bytes_per_sec(mode, quality):
+    if mode == 'audio':
+        return AUDIO_BYTES_PER_SEC
+    height = quality_height(quality) or 1080
+    return next((rate for h, rate in VIDEO_BYTES_PER_SEC if height <= h), VIDEO_BYTES_PER_SEC[-1][1])
+
+def pick_formats(formats, mode, quality):
+    """Formats format_spec(mode, quality) most likely selects; close enough for a size estimate"""
+    height = quality_height(quality)
+    
+    def fits(f):
+        return not height or not f.get('height') or f['height'] <= height
+    
+    def bitrate(f):
+        return f.get('tbr') or 0
+    
+    def picture(f):
+        return f.get('height') or 0, bitrate(f)
+    
+    audio = [f for f in formats if f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none')]
+    if mode == 'audio':
+        return [max(audio, key=bitrate)] if audio else formats[-1:]
+    video = [f for f in formats if f.get('acodec') == 'none' and f.get('vcodec') not in (None, 'none') and fits(f)]
+    if video and audio:
+        return [max(video, key=picture), max(audio, key=bitrate)]
+    muxed = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') != 'none' and fits(f)]
+    # yt-dlp sorts formats worst to best, so the last one is its "best"
+    return [max(muxed, key=picture)] if muxed else formats[-1:]
+
+def estimate_item_bytes(info, mode, quality):
+    """Expected size of one video as (bytes, exact). exact is True when the sizes are
+    reported for the formats the job would pick; otherwise the size is guessed from
+    bitrates and the duration. (None, False) when neither is known."""
+    duration = info.get('duration')
+    formats = info.get('formats')
+    if formats:
+        chosen = pick_formats(formats, mode, quality)
+        if chosen:
+            sizes = [f.get('filesize') or f.get('filesize_approx') for f in chosen]
+            if all(sizes):
+                return int(sum(sizes)), True
+            if duration and all(size or f.get('tbr') for size, f in zip(sizes, chosen)):
+                return int(sum(size or f['tbr'] * 1000 / 8 * duration for size, f in zip(sizes, chosen))), False
+    if duration:
+        return int(duration * typical_bytes_per_sec(mode, quality)), False
+    return None, False
+
+def free_space(folder):
+    """Free bytes on the drive folder is (or will be created) on"""
+    while folder and not os.path.isdir(folder):
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+    return shutil.disk_usage(folder or '.').free
+
+def format_size(n):
+    return f"{n / 1024 ** 3:.1f} GB" if n >= 1024 ** 3 else f"{n / 1024 ** 2:.0f} MB"
+
+def plan_output_names(ydl, job, folder):
+    """Final file name (without extension) for every playlist item of the job.
+    
+    Names come from the job's own template, so they match what yt-dlp would pick.
+    A name already taken by an earlier item, or by a file the download history
+    credits to a different video, gets the playlist position appended instead of
+    overwriting or being mistaken for an earlier download. Returns the names and
+    the indices whose file is already there.
+    """
+    names = {}
+    existing = set()
+    taken = set()
+    try:
+        on_disk = {name.lower(): name for name in os.listdir(folder)}
+    except OSError:
+        on_disk = {}
+    for index, entry in job.playlist_entries:
+        if not entry:
+            continue
+        path = ydl.prepare_filename({**entry, 'ext': 'NA'})
+        name = os.path.splitext(os.path.basename(path))[0] or str(entry.get('id') or index + 1)
+        key = download_archive.key_for(entry)
+        for candidate in (name, f"{name}-{index + 1}", f"{name}-{index + 1}-{entry.get('id')}"):
+            if candidate.lower() in taken:
+                continue
+            paths = [os.path.join(folder, on_disk[f'{candidate}.{ext}'.lower()]) for ext in OUTPUT_EXTS[job.mode]
+                     if f'{candidate}.{ext}'.lower() in on_disk]
+            owners = {download_archive.owner_of(path) for path in paths} - {None}
+            # Entries without an ID can't be told apart; keep yt-dlp's own "already downloaded" check
+            if not owners or key is None or owners == {key}:
+                if paths:
+                    existing.add(index)  # yt-dlp will skip it as already downloaded
+                break
+        taken.add(candidate.lower())
+        names[index] = candidate
+    return names, existing
+
+def plan_download(job, ydl_opts, folder, info=None):
+    """Check the job fits on the download drive and fix its playlist file names.
+    
+    Runs before anything is downloaded, so a playlist that can't fit fails right
+    away instead of hours in. Sizes come from the already fetched info (format
+    sizes, or duration for flat playlist entries). Sizes reported for the chosen
+    formats count fully; guessed ones (bitrate x duration) can be several times
+    too high, so they only fail the job when a PLAN_GUESS_SLACK-th of them still
+    doesn't fit, and just log a warning otherwise.
+    """
+    if job.playlist_entries:
+        with yt_dlp.YoutubeDL(dict(ydl_opts, logger=ytdlp_logger)) as ydl:
+            job.output_names, existing = plan_output_names(ydl, job, folder)
+        items = [e for i, e in job.playlist_entries if e and i not in existing]
+    elif info and info.get('_type', 'video') == 'video':
+        items = [info]
+    else:
+        return  # Nothing known about the download yet
+    estimates = [estimate_item_bytes(e, job.mode, job.quality) for e in items]
+    
+    sizes = [size for size, _ in estimates if size]
+    if not sizes:
+        return
+    # Merging/converting keeps an item's parts next to its output until it's done
+    at_once = playlist_workers if job.playlist_entries else 1
+    
+    def space_needed(sizes):
+        return int((sum(sizes) + sum(sorted(sizes)[-at_once:])) * PLAN_MARGIN) if sizes else 0
+    
+    needed = space_needed(sizes)
+    # Lower bound: reported sizes, plus guesses scaled down by their uncertainty
+    known = space_needed([size if exact else size / PLAN_GUESS_SLACK for size, exact in estimates if size])
+    job.estimated_bytes = needed
+    free = free_space(folder)
+    available = max(0, free - PLAN_RESERVE_BYTES)
+    log.info(f"[Plan] {len(sizes)} of {len(items)} items sized, ~{format_size(needed)} needed, {format_size(free)} free")
+    if known > available:
+        raise Exception(f"Not enough disk space: at least {format_size(known)} needed, "
+                        f"{format_size(available)} available in {folder}")
+    if needed > available:
+        log.warning(f"[Plan] Download may not fit: ~{format_size(needed)} guessed from bitrates and durations, "
+                    f"{format_size(available)} available in {folder}")
+
+_planned_filename_pp_class = None
+
+def attach_output_names(ydl, job):
+    """Name the playlist items this YoutubeDL downloads as planned by plan_download
+    (its outtmpl must use %(planned_filename)s, see download_job)"""
+    global _planned_filename_pp_class
+    if not job.output_names:
+        return
+    if _planned_filename_pp_class is None:
+        class PlannedFilenamePP(yt_dlp.postprocessor.PostProcessor):
+            def __init__(self, names, downloader=None):
+                super().__init__(downloader)
+                self.names = names
             
-            if not cancel_flag:
-                # Send final playlist progress
-                if is_playlist_download:
-                    eel.update_playlist_progress(_playlist_current_index, _playlist_total_count, "All downloads complete!", False)
-                eel.download_complete(True, "Download completed!")
+            def run(self, info):
+                index = (info.get('playlist_index') or 0) - 1
+                info['planned_filename'] = self.names.get(index) or (info.get('title') or info.get('id') or 'NA')[:100]
+                return [], info
+        _planned_filename_pp_class = PlannedFilenamePP
+    ydl.add_post_processor(_planned_filename_pp_class(job.output_names), when='pre_process')
+
+def format_progress(d):
+    """Turn a yt-dlp progress dict into the (percent, speed, eta, size) strings shown in the UI"""
+    # Calculate progress
+    if d.get('status') == 'finished':
+        p = 100
+    elif d.get('total_bytes'):
+        p = d['downloaded_bytes'] / d['total_bytes'] * 100
+    elif d.get('total_bytes_estimate'):
+        p = d['downloaded_bytes'] / d['total_bytes_estimate'] * 100
+    else:
+        p = 0
+        
+    percentage = f"{p:.1f}%"
+    
+    # Get speed
+    speed = d.get('_speed_str', '')
+    if not speed:
+        speed_val = d.get('speed', 0)
+        if speed_val:
+            if speed_val > 1024 * 1024:
+                speed = f"{speed_val / (1024 * 1024):.2f}MiB/s"
+            elif speed_val > 1024:
+                speed = f"{speed_val / 1024:.2f}KiB/s"
+            else:
+                speed = f"{speed_val:.0f}B/s"
+        else:
+            speed = "-"
+    speed = strip_ansi(speed.strip())
+    
+    # Get ETA
+    eta = d.get('_eta_str', '')
+    if not eta:
+        eta_val = d.get('eta', 0)
+        if eta_val:
+            mins, secs = divmod(int(eta_val), 60)
+            eta = f"{mins:02d}:{secs:02d}"
+    eta = strip_ansi(str(eta).strip())
+    
+    # Get size
+    size = ""
+    if d.get('total_bytes'):
+        size = f"{d['total_bytes'] / (1024 * 1024):.2f}MiB"
+    elif d.get('total_bytes_estimate'):
+        size = f"~{d['total_bytes_estimate'] / (1024 * 1024):.2f}MiB"
+    elif d.get('downloaded_bytes'):
+         size = f"{d['downloaded_bytes'] / (1024 * 1024):.2f}MiB+"
+    
+    return percentage, speed, eta, size
+
+class ProgressAggregator:
+    """Samples progress hook data per job and sends it to the UI at a bounded rate.
+    
+    Hooks only store the latest dict for their job; a single flusher thread formats
+    whatever changed and sends every job's update in one eel call. Terminal events
+    (a finished file, an error, job completion) skip the wait and go out immediately.
+    """
+    def __init__(self, rate_hz=8):
+        self.rate_hz = rate_hz
+        self._cond = threading.Condition()
+        self._pending = {}  # job -> latest progress dict
+        self._next_emit = 0
+        self._thread = None
+    
+    def update(self, job, d):
+        with self._cond:
+            self._pending[job] = d
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+    
+    def flush_job(self, job, d=None):
+        """Send this job's latest progress (or d) right away"""
+        with self._cond:
+            pending = self._pending.pop(job, None)
+        d = d or pending
+        if d:
+            self._emit({job: d})
+    
+    def complete(self, job, success, message):
+        """Report a finished job after any progress still waiting to be sent"""
+        self.flush_job(job)
+        emit_event('complete', success, message, job.id)
+    
+    def flush(self):
+        with self._cond:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self._emit(pending)
+    
+    def _emit(self, pending):
+        updates = []
+        for job, d in pending.items():
+            try:
+                percentage, speed, eta, size = format_progress(d)
+            except Exception as e:
+                log.error(f"[Error] Progress hook error: {e}")
+                continue
+            job.progress = {'percent': percentage, 'speed': speed, 'eta': eta, 'size': size}
+            updates.append({'job_id': job.id, **job.progress})
+        if updates:
+            emit_event('progress', updates)
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let updates pile up until the next emit slot
+            delay = self._next_emit - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_emit = time.monotonic() + 1.0 / max(0.1, self.rate_hz)
+            self.flush()
+
+progress_aggregator = ProgressAggregator(progress_update_hz)
+
+@eel.expose
+def set_progress_update_rate(rate_hz):
+    """Set the maximum number of progress updates per second sent to the UI"""
+    global progress_update_hz
+    progress_update_hz = max(0.1, float(rate_hz))
+    progress_aggregator.rate_hz = progress_update_hz
+    save_config()
+    return progress_update_hz
+
+# Bandwidth limiting
+class TokenBucket:
+    """Thread-safe token bucket over bytes per second (0 = unlimited).
+    
+    consume() never refuses: it takes the bytes (the balance may go negative)
+    and sleeps until the debt is paid, so any number of threads sharing one
+    bucket stay under its rate in aggregate. The wait is taken in short slices,
+    so a new rate or a stopped job ends it early.
+    """
+    def __init__(self, rate=0):
+        self._lock = threading.Lock()
+        self.rate = 0
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self.set_rate(rate)
+    
+    def set_rate(self, rate):
+        with self._lock:
+            self.rate = max(0, int(rate or 0))
+            # One second of burst, starting full
+            self._tokens = float(self.rate)
+            self._last = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+    
+    def consume(self, amount, stopped=None):
+        """Take amount bytes and wait until the balance is paid back (or stopped() is true)"""
+        if amount <= 0 or not self.rate:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+        # Sleep in slices, recomputing the wait, so a new limit or a stopped job takes effect quickly
+        while not (stopped and stopped()):
+            with self._lock:
+                if not self.rate:
+                    return
+                self._refill()
+                if self._tokens >= 0:
+                    return
+                wait = -self._tokens / self.rate
+            time.sleep(min(0.25, wait))
+
+global_bandwidth = TokenBucket(bandwidth_limit)
+
+def limit_bandwidth(d, job):
+    """Charge the bytes received since the last hook call to the global and per-job buckets"""
+    downloaded = d.get('downloaded_bytes')
+    if d['status'] != 'downloading' or downloaded is None:
+        return
+    key = d.get('filename')
+    # Tracked even without a limit, so turning one on mid-file only charges new bytes
+    with job.lock:
+        last = job.bytes_seen.get(key)
+        job.bytes_seen[key] = downloaded
+    if last is None or not (global_bandwidth.rate or job.bandwidth.rate):
+        # First report of a file (it may include a resumed .part) isn't charged
+        return
+    # Bytes going down means the file restarted; count it from zero
+    delta = downloaded - last if downloaded >= last else downloaded
+    # Sleeping here holds the download thread, which in turn slows the socket reads
+    stopped = lambda: job.stopped
+    global_bandwidth.consume(delta, stopped)
+    job.bandwidth.consume(delta, stopped)
+
+@eel.expose
+def set_bandwidth_limit(bytes_per_sec, job_id=None):
+    """Limit total throughput, or one job's throughput when job_id is given (0 = unlimited)"""
+    global bandwidth_limit
+    if job_id:
+        job = download_queue.get(job_id)
+        if not job:
+            return False
+        job.bandwidth.set_rate(bytes_per_sec)
+        return True
+    bandwidth_limit = max(0, int(bytes_per_sec or 0))
+    global_bandwidth.set_rate(bandwidth_limit)
+    save_config()
+    return True
+
+@eel.expose
+def get_bandwidth_limits():
+    return {
+        'global': global_bandwidth.rate,
+        'jobs': {j.id: j.bandwidth.rate for j in download_queue.active_jobs() if j.bandwidth.rate},
+    }
+
+# Adaptive download tuning
+DEFAULT_FRAGMENT_WORKERS = 4
+DEFAULT_CHUNK_SIZE = 1024 * 1024 * 10
+MAX_ADAPTIVE_PROFILES = 200
+PROFILE_REPROBE_AFTER = 24 * 3600  # Settled profiles are searched again after a day
+
+_tuning_pp_class = None
+
+def tuning_pp(tuner):
+    """Postprocessor that runs before each file is downloaded and hands the tuner that file's params"""
+    global _tuning_pp_class
+    # Defined on first use since the base class comes from the lazily imported yt-dlp
+    if _tuning_pp_class is None:
+        class TuningPP(yt_dlp.postprocessor.PostProcessor):
+            def __init__(self, tuner, downloader=None):
+                super().__init__(downloader)
+                self.tuner = tuner
             
-        except Exception as e:
-            if not cancel_flag:
-                error_msg = str(e)
-                print(f"[Error] Download: {error_msg}")
-                eel.download_complete(False, error_msg)
+            def run(self, info):
+                self.tuner.before_download(info, self._downloader.params)
+                return [], info
+        _tuning_pp_class = TuningPP
+    return _tuning_pp_class(tuner)
+
+class DownloadTuner:
+    """Adjusts fragment concurrency and HTTP chunk size of a job between files.
     
-    thread = threading.Thread(target=download_thread, daemon=True)
-    thread.start()
+    yt-dlp reads both settings when a file starts, so every finished file is one
+    throughput sample for the setting it used (fragment count for HLS/DASH, chunk
+    size for plain HTTP). A setting that beats the best sample so far is pushed
+    further; otherwise the job goes back to the best one, trying the other
+    direction once. Retries halve the setting. The search state is remembered
+    per extractor/host, so later jobs (and single-file jobs) carry it on.
+    """
+    MIN_SAMPLE_BYTES = 2 * 1024 * 1024  # Smaller files finish too fast to measure
+    MIN_GAIN = 1.05  # A step must be 5% faster to count as better
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.key = None
+        self.settings = {'fragments': DEFAULT_FRAGMENT_WORKERS, 'chunk_size': DEFAULT_CHUNK_SIZE}
+        self.best = {}  # knob -> (bytes per second, value)
+        self._direction = {'fragments': 1, 'chunk_size': 1}  # 1 = up, -1 = down, 0 = settled
+        self._tried = {}  # knob -> values already sampled
+        self._files = {}  # filename -> sample in progress
+        self.retries = 0
+        self.logger = YtDlpLogger(self)
+    
+    @staticmethod
+    def profile_key(info):
+        extractor = (info.get('extractor_key') or info.get('ie_key') or 'generic').lower()
+        host = info.get('webpage_url_domain') or urllib.parse.urlparse(info.get('webpage_url') or '').hostname or ''
+        return f"{extractor}:{host.lower()}"
+    
+    @staticmethod
+    def bounds(knob):
+        return fragment_workers_bounds if knob == 'fragments' else chunk_size_bounds
+    
+    def clamp(self, knob, value):
+        low, high = self.bounds(knob)
+        return max(low, min(high, int(value)))
+    
+    def attach(self, ydl):
+        """Let the tuner set the params of each file this YoutubeDL downloads"""
+        ydl.add_post_processor(tuning_pp(self), when='before_dl')
+    
+    def apply(self, params):
+        with self._lock:
+            params['concurrent_fragment_downloads'] = self.settings['fragments']
+            params['http_chunk_size'] = self.settings['chunk_size']
+    
+    def before_download(self, info, params):
+        if adaptive_tuning:
+            with self._lock:
+                if self.key is None:
+                    self._load_profile(info)
+        self.apply(params)
+    
+    def _load_profile(self, info):
+        self.key = self.profile_key(info)
+        profile = adaptive_profiles.get(self.key) or {}
+        stale = time.time() - profile.get('updated', 0) > PROFILE_REPROBE_AFTER
+        for knob in self.settings:
+            saved = profile.get(knob)
+            if not isinstance(saved, dict) or not saved.get('best'):
+                continue
+            best = self.clamp(knob, saved['best'])
+            if stale:
+                # Links change: measure the old best again and keep climbing from there
+                self.settings[knob] = best
+            else:
+                # Continue the search where the last job left it; older speeds count for a bit less
+                self.settings[knob] = self.clamp(knob, saved.get('next') or best)
+                self._direction[knob] = saved.get('direction', 0)
+                self.best[knob] = (saved.get('speed', 0) * 0.9, best)
+        if profile:
+            log.info(f"[Tuning] {self.key}: starting from {self.settings}")
+    
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+    
+    def observe(self, d):
+        """Feed a progress dict; finished files become samples"""
+        if not adaptive_tuning or d['status'] not in ('downloading', 'finished'):
+            return
+        filename = d.get('filename')
+        now = time.monotonic()
+        with self._lock:
+            sample = self._files.get(filename)
+            if sample is None:
+                if d['status'] != 'downloading':
+                    return
+                knob = 'fragments' if d.get('fragment_count') else 'chunk_size'
+                self._files[filename] = {
+                    'knob': knob,
+                    'value': self.settings[knob],
+                    'start': now,
+                    'start_bytes': d.get('downloaded_bytes') or 0,
+                    'start_retries': self.retries,
+                    'requests': d.get('fragment_count') or 1,
+                }
+                return
+            if d['status'] == 'finished':
+                del self._files[filename]
+                size = (d.get('downloaded_bytes') or d.get('total_bytes') or 0) - sample['start_bytes']
+                elapsed = now - sample['start']
+                if size >= self.MIN_SAMPLE_BYTES and elapsed > 0:
+                    self._evaluate(sample, size / elapsed, self.retries - sample['start_retries'])
+    
+    def _evaluate(self, sample, speed, retries):
+        knob, value = sample['knob'], sample['value']
+        best_speed, best_value = self.best.get(knob, (0, value))
+        self._tried.setdefault(knob, set()).add(value)
+        if retries > max(1, sample['requests'] // 50):
+            # More than 2% of requests retried: the server or link is pushing back
+            self.settings[knob] = self.clamp(knob, value // 2)
+            self._direction[knob] = 0
+            reason = f"{retries} retries"
+        elif speed > best_speed * self.MIN_GAIN:
+            self.best[knob] = (speed, value)
+            step = self._direction[knob]
+            next_value = self.clamp(knob, value * 2 if step > 0 else value // 2) if step else value
+            if next_value == value or next_value in self._tried[knob]:
+                next_value = value
+                self._direction[knob] = 0
+            self.settings[knob] = next_value
+            reason = "faster"
+        else:
+            # No gain: go back to the best setting, trying the other direction once
+            lower = self.clamp(knob, best_value // 2)
+            if self._direction[knob] > 0 and lower not in self._tried[knob]:
+                self.settings[knob] = lower
+                self._direction[knob] = -1
+            else:
+                self.settings[knob] = best_value
+                self._direction[knob] = 0
+            reason = "no gain"
+        log.info(f"[Tuning] {knob}={value}: {speed / 1024 / 1024:.2f} MiB/s ({reason}), next {self.settings[knob]}")
+    
+    def save_profile(self):
+        """Remember the best settings (and the next step to try) for this extractor/host"""
+        with self._lock:
+            if not adaptive_tuning or not self.key or not self.best:
+                return
+            profile = dict(adaptive_profiles.get(self.key) or {})
+            for knob, (speed, value) in self.best.items():
+                profile[knob] = {
+                    'best': value,
+                    'speed': int(speed),
+                    'next': self.settings[knob],
+                    'direction': self._direction[knob],
+                }
+            profile['updated'] = time.time()
+        with _config_lock:
+            adaptive_profiles[self.key] = profile
+            # Keep the most recently used hosts
+            while len(adaptive_profiles) > MAX_ADAPTIVE_PROFILES:
+                oldest = min(adaptive_profiles, key=lambda k: adaptive_profiles[k].get('updated', 0))
+                del adaptive_profiles[oldest]
+        save_config()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'key': self.key,
+                'fragments': self.settings['fragments'],
+                'chunk_size': self.settings['chunk_size'],
+                'retries': self.retries,
+            }
+
+@eel.expose
+def get_adaptive_profiles():
+    with _config_lock:
+        return copy.deepcopy(adaptive_profiles)
+
+@eel.expose
+def reset_adaptive_profiles():
+    with _config_lock:
+        adaptive_profiles.clear()
+    save_config()
     return True
 
-# Global for tracking download process
-_current_ydl = None
+@eel.expose
+def set_adaptive_tuning(enabled, fragment_bounds=None, chunk_bounds=None):
+    """Turn adaptive tuning on/off and optionally change its [min, max] bounds"""
+    global adaptive_tuning, fragment_workers_bounds, chunk_size_bounds
+    adaptive_tuning = bool(enabled)
+    if fragment_bounds is not None:
+        fragment_workers_bounds = parse_bounds(fragment_bounds, fragment_workers_bounds)
+    if chunk_bounds is not None:
+        chunk_size_bounds = parse_bounds(chunk_bounds, chunk_size_bounds)
+    save_config()
+    return get_config()
 
-def progress_hook(d):
-    global cancel_flag
-    if cancel_flag:
+def progress_hook(d, job):
+    if job.stopped:
         raise yt_dlp.utils.DownloadCancelled("Download cancelled by user")
-    global _current_ydl # Changed from cancel_flag to _current_ydl
     
     if d['status'] == 'downloading':
-        try:
-            # Calculate progress
-            if d.get('total_bytes'):
-                p = d['downloaded_bytes'] / d['total_bytes'] * 100
-            elif d.get('total_bytes_estimate'):
-                p = d['downloaded_bytes'] / d['total_bytes_estimate'] * 100
-            else:
-                p = 0
-                
-            percentage = f"{p:.1f}%"
-            
-            # Get speed
-            speed = d.get('_speed_str', '')
-            if not speed:
-                speed_val = d.get('speed', 0)
-                if speed_val:
-                    if speed_val > 1024 * 1024:
-                        speed = f"{speed_val / (1024 * 1024):.2f}MiB/s"
-                    elif speed_val > 1024:
-                        speed = f"{speed_val / 1024:.2f}KiB/s"
+        progress_aggregator.update(job, d)
+    elif d['status'] in ('finished', 'error'):
+        progress_aggregator.flush_job(job, d)
+
+@eel.expose
+def cancel_download(job_id=None):
+    """Cancel one job, or every unfinished job when no ID is given"""
+    if job_id:
+        job_ids = [job_id]
+    else:
+        job_ids = [j.id for j in download_queue.active_jobs()]
+    cancelled = False
+    for jid in job_ids:
+        if download_queue.cancel(jid):
+            cancelled = True
+            # Immediately notify UI
+            progress_aggregator.complete(download_queue.get(jid), False, "Download cancelled")
+    return cancelled
+
+# Job API
+API_INFO_SLOTS = 4  # fetch_video_info calls served at once
+API_MAX_BODY = 64 * 1024
+SSE_QUEUE_SIZE = 1000  # Events buffered per stream client before the oldest are dropped
+SSE_HEARTBEAT = 15
+
+class ApiSink(ProgressSink):
+    """Fans engine events out to the API's event-stream clients"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = []  # (queue, job_id filter or None)
+    
+    def subscribe(self, job_id=None):
+        import queue
+        client = (queue.Queue(SSE_QUEUE_SIZE), job_id)
+        with self._lock:
+            self._clients.append(client)
+        return client
+    
+    def unsubscribe(self, client):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+    
+    def publish(self, event, data):
+        import queue
+        with self._lock:
+            clients = list(self._clients)
+        for q, job_id in clients:
+            if job_id and data.get('job_id') != job_id:
+                continue
+            # Slow clients lose their oldest events rather than holding up the engine
+            while True:
+                try:
+                    q.put_nowait((event, data))
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+    
+    def progress(self, updates):
+        for update in updates:
+            self.publish('progress', update)
+    
+    def playlist_progress(self, current, total, title, active, job_id):
+        self.publish('playlist_progress', {'job_id': job_id, 'current': current, 'total': total, 'title': title, 'active': active})
+    
+    def complete(self, success, message, job_id):
+        self.publish('complete', {'job_id': job_id, 'success': success, 'message': message})
+
+api_sink = ApiSink()
+_api_server = None
+_api_info_slots = threading.BoundedSemaphore(API_INFO_SLOTS)
+
+def make_api_handler():
+    from http.server import BaseHTTPRequestHandler
+    import hmac
+    import queue
+    
+    class ApiHandler(BaseHTTPRequestHandler):
+        """REST endpoints over the download queue (all require the bearer token)"""
+        server_version = f"UVD/{APP_VERSION}"
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, format, *args):
+            # Never log the token of event-stream clients passing it in the query
+            message = re.sub(r'token=[^&\s]+', 'token=***', format % args)
+            log.info(f"[API] {self.address_string()} {message}")
+        
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def send_text(self, status, text):
+            data = text.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > API_MAX_BODY:
+                raise ValueError("Request body too large")
+            body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+            if not isinstance(body, dict):
+                raise ValueError("Expected a JSON object")
+            return body
+        
+        def authorized(self, query):
+            token = api_token or ''
+            header = self.headers.get('Authorization', '')
+            given = header[7:] if header.startswith('Bearer ') else (query.get('token') or [''])[0]
+            if token and hmac.compare_digest(given.encode(), token.encode()):
+                return True
+            self.send_json(401, {'error': 'Unauthorized'}, {'WWW-Authenticate': 'Bearer'})
+            return False
+        
+        def route(self, method):
+            url = urllib.parse.urlsplit(self.path)
+            query = urllib.parse.parse_qs(url.query)
+            parts = [p for p in url.path.split('/') if p]
+            if not self.authorized(query):
+                return
+            try:
+                if parts == ['jobs'] and method == 'POST':
+                    self.create_job()
+                elif parts == ['jobs'] and method == 'GET':
+                    self.send_json(200, {'jobs': [j.to_dict() for j in download_queue.list()]})
+                elif len(parts) == 2 and parts[0] == 'jobs' and method in ('GET', 'DELETE'):
+                    job = download_queue.get(parts[1])
+                    if not job:
+                        self.send_json(404, {'error': 'Unknown job'})
+                    elif method == 'DELETE':
+                        cancel_download(job.id)
+                        self.send_json(200, job.to_dict())
                     else:
-                        speed = f"{speed_val:.0f}B/s"
+                        self.send_json(200, job.to_dict())
+                elif parts == ['info'] and method == 'POST':
+                    self.fetch_info()
+                elif parts == ['events'] and method == 'GET':
+                    self.stream_events((query.get('job') or [None])[0])
+                elif parts == ['metrics'] and method == 'GET':
+                    self.send_text(200, metrics.prometheus(runtime_gauges()))
                 else:
-                    speed = "-"
-            speed = strip_ansi(speed.strip())
-            
-            # Get ETA
-            # Get ETA
-            eta = d.get('_eta_str', '')
-            if not eta:
-                eta_val = d.get('eta', 0)
-                if eta_val:
-                    mins, secs = divmod(int(eta_val), 60)
-                    eta = f"{mins:02d}:{secs:02d}"
-            eta = strip_ansi(str(eta).strip())
-            
-            # Get size
-            size = ""
-            if d.get('total_bytes'):
-                size = f"{d['total_bytes'] / (1024 * 1024):.2f}MiB"
-            elif d.get('total_bytes_estimate'):
-                size = f"~{d['total_bytes_estimate'] / (1024 * 1024):.2f}MiB"
-            elif d.get('downloaded_bytes'):
-                 size = f"{d['downloaded_bytes'] / (1024 * 1024):.2f}MiB+"
-            
-            # Send to UI
-            eel.update_progress(percentage, speed, eta, size)
+                    self.send_json(404, {'error': 'Not found'})
+            except (ValueError, TypeError) as e:
+                self.send_json(400, {'error': str(e)})
+        
+        def create_job(self):
+            body = self.read_json()
+            url = body.get('url')
+            if not url or not isinstance(url, str):
+                raise ValueError("'url' is required")
+            options = job_options(body)
+            waiting = sum(1 for j in download_queue.active_jobs() if j.status == 'queued')
+            if waiting >= api_max_queued:
+                self.send_json(429, {'error': 'Queue is full', 'queued': waiting}, {'Retry-After': '30'})
+                return
+            job_id = start_download(url, *options)
+            self.send_json(202, download_queue.get(job_id).to_dict(), {'Location': f'/jobs/{job_id}'})
+        
+        def fetch_info(self):
+            body = self.read_json()
+            if not body.get('url') or not isinstance(body['url'], str):
+                raise ValueError("'url' is required")
+            if not _api_info_slots.acquire(blocking=False):
+                self.send_json(429, {'error': 'Too many info requests'}, {'Retry-After': '5'})
+                return
+            try:
+                info = fetch_video_info(body['url'])
+            finally:
+                _api_info_slots.release()
+            self.send_json(200 if info.get('success') else 422, info)
+        
+        def stream_events(self, job_id):
+            client = api_sink.subscribe(job_id)
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                while True:
+                    try:
+                        event, data = client[0].get(timeout=SSE_HEARTBEAT)
+                        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                    except queue.Empty:
+                        message = ": keep-alive\n\n"
+                    self.wfile.write(message.encode('utf-8'))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError, OSError):
+                pass
+            finally:
+                api_sink.unsubscribe(client)
+        
+        def do_GET(self):
+            self.route('GET')
+        
+        def do_POST(self):
+            self.route('POST')
+        
+        def do_DELETE(self):
+            self.route('DELETE')
+    
+    return ApiHandler
+
+def start_api_server():
+    """Serve the job API in the background (no-op if it is already running)"""
+    global _api_server, api_token
+    from http.server import ThreadingHTTPServer
+    import secrets
+    if _api_server:
+        return True
+    if not api_token:
+        api_token = secrets.token_urlsafe(32)
+        save_config()
+    try:
+        _api_server = ThreadingHTTPServer((api_host, api_port), make_api_handler())
+    except OSError as e:
+        log.error(f"[API] Could not listen on {api_host}:{api_port}: {e}")
+        return False
+    _api_server.daemon_threads = True
+    if api_sink not in progress_sinks:
+        progress_sinks.append(api_sink)
+    threading.Thread(target=_api_server.serve_forever, daemon=True, name='api').start()
+    log.info(f"[API] Listening on http://{api_host}:{api_port}")
+    return True
+
+def stop_api_server():
+    global _api_server
+    if _api_server:
+        _api_server.shutdown()
+        _api_server.server_close()
+        _api_server = None
+    if api_sink in progress_sinks:
+        progress_sinks.remove(api_sink)
+
+@eel.expose
+def get_api_settings():
+    return {
+        'enabled': api_enabled,
+        'running': _api_server is not None,
+        'host': api_host,
+        'port': api_port,
+        'token': api_token,
+        'max_queued': api_max_queued,
+    }
+
+@eel.expose
+def set_api_enabled(enabled, port=None):
+    """Start or stop the job API (the port change applies on the next start)"""
+    global api_enabled, api_port
+    api_enabled = bool(enabled)
+    if port:
+        api_port = int(port)
+    stop_api_server()
+    if api_enabled:
+        start_api_server()
+    save_config()
+    return get_api_settings()
+
+@eel.expose
+def regenerate_api_token():
+    global api_token
+    import secrets
+    api_token = secrets.token_urlsafe(32)
+    save_config()
+    return api_token
+
+# Headless mode
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=f"{APP_NAME} v{APP_VERSION}")
+    parser.add_argument('--headless', action='store_true', help="Run without a window, printing JSON progress lines on stdout")
+    parser.add_argument('urls', nargs='*', help="URLs to download (headless)")
+    parser.add_argument('-i', '--input', help="File with one URL per line ('-' for stdin, '#' starts a comment)")
+    parser.add_argument('--mode', choices=['video', 'audio'], default='video')
+    parser.add_argument('--quality', default='Best', help="Best, 1080p, 720p, ...")
+    parser.add_argument('--playlist-mode', choices=['single', 'all'], default='single')
+    parser.add_argument('--cookies', help="cookies.txt file")
+    parser.add_argument('--workers', type=int, help="Jobs downloading at the same time")
+    parser.add_argument('--playlist-workers', type=int, help="Playlist items downloaded at the same time per job")
+    parser.add_argument('-o', '--output', help="Download folder")
+    parser.add_argument('--serve', action='store_true', help="Keep running and accept jobs over the HTTP job API (headless)")
+    parser.add_argument('--api-port', type=int, help="Port for the job API")
+    parser.add_argument('--profile', action='store_true', help="Sample where time goes and write folded stacks to the app data folder on exit")
+    return parser.parse_args(argv)
+
+def read_url_list(path):
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+def run_headless(args):
+    """Download the given URLs with the GUI's engine, reporting progress as JSON lines. Returns the exit code."""
+    global download_folder, cookies_file, playlist_workers, api_port, profiling
+    # stdout carries only JSON events; log lines go to stderr
+    sink = JsonSink(sys.stdout)
+    sys.stdout = sys.stderr
+    progress_sinks[:] = [sink]
+    
+    load_config()
+    # Options given on the command line apply to this run only
+    if args.output:
+        _run_overrides['download_folder'] = download_folder
+        download_folder = os.path.abspath(args.output)
+        os.makedirs(download_folder, exist_ok=True)
+    if args.cookies:
+        _run_overrides['cookies_file'] = cookies_file
+        cookies_file = os.path.abspath(args.cookies)
+    if args.workers:
+        download_queue.set_max_workers(max(1, args.workers))
+    if args.playlist_workers:
+        _run_overrides['playlist_workers'] = playlist_workers
+        playlist_workers = max(1, args.playlist_workers)
+    if args.profile:
+        _run_overrides['profiling'] = profiling
+        profiling = True
+    
+    urls = list(args.urls)
+    if args.input:
+        urls += read_url_list(args.input)
+    if not urls and not args.serve:
+        sink.write('error', message="No URLs given")
+        return 2
+    
+    if args.serve:
+        if args.api_port:
+            _run_overrides['api_port'] = api_port
+            api_port = args.api_port
+        if not start_api_server():
+            return 2
+        sink.write('api', host=api_host, port=api_port)
+    
+    job_ids = []
+    for url in urls:
+        job_id = start_download(url, args.mode, args.quality, args.playlist_mode)
+        job_ids.append(job_id)
+        sink.write('queued', job_id=job_id, url=url)
+    
+    try:
+        while True:
+            jobs = [download_queue.get(job_id) for job_id in job_ids]
+            if not args.serve and all(job.status in ('completed', 'failed', 'cancelled') for job in jobs):
+                break
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        cancel_download()
+        sink.write('interrupted')
+        return 130
+    
+    failed = [job for job in jobs if job.status != 'completed']
+    if args.profile:
+        sink.write('profile', files=dump_profiler_stats())
+    sink.write('summary', total=len(jobs), completed=len(jobs) - len(failed), failed=len(failed),
+               jobs=[{'job_id': job.id, 'url': job.url, 'status': job.status, 'error': job.error} for job in jobs])
+    return 1 if failed else 0
+
+# Startup
+def prewarm():
+    """Import yt-dlp and build its option parser in the background so the first fetch is fast"""
+    def run():
+        start = time.perf_counter()
+        try:
+            with yt_dlp.YoutubeDL({'logger': ytdlp_logger}):
+                pass
+            mark_startup('prewarm', time.perf_counter() - start)
         except Exception as e:
-            print(f"[Error] Progress hook error: {e}")
+            log.warning(f"[Startup] Prewarm failed: {e}")
+    threading.Thread(target=run, daemon=True, name='prewarm').start()
+
+_prewarm_started = threading.Event()
+
+def start_prewarm():
+    if not _prewarm_started.is_set():
+        _prewarm_started.set()
+        prewarm()
 
 @eel.expose
-def cancel_download():
-    global cancel_flag, _current_ydl
-    cancel_flag = True
-    # Immediately notify UI
-    eel.download_complete(False, "Download cancelled")
-    return True
+def report_ui_ready():
+    """Called by the page once it has rendered; heavy imports start after this"""
+    if not any(e['event'] == 'ui_ready' for e in _startup_timeline):
+        mark_startup('ui_ready')
+        log.info("[Startup] " + ", ".join(f"{e['event']} {e['at']:.2f}s" for e in _startup_timeline))
+    start_prewarm()
+
+@eel.expose
+def get_startup_timeline():
+    return list(_startup_timeline)
 
 # Main entry point
 if __name__ == '__main__':
-    print("--- Starting Universal Video Downloader v2.1 ---")
+    mark_startup('module_loaded')
+    cli_args = parse_args()
+    if cli_args.headless:
+        sys.exit(run_headless(cli_args))
+    
+    log.info("--- Starting Universal Video Downloader v2.1 ---")
     load_config()
+    mark_startup('config_loaded')
+    
+    # Initialize Eel (scans web/ for exposed JS functions)
+    start = time.perf_counter()
+    eel.init('web')
+    mark_startup('eel_init', time.perf_counter() - start)
+    
+    # Jobs cut off by the last exit; the UI offers to resume them
+    _interrupted_jobs = job_journal.load_incomplete()
+    if _interrupted_jobs:
+        log.info(f"[Journal] {len(_interrupted_jobs)} interrupted job(s) can be resumed")
+    
+    if api_enabled:
+        start_api_server()
     
     browser_path = find_any_chromium_browser()
+    mark_startup('browser_launch')
+    # Fallback in case the page never reports back
+    prewarm_timer = threading.Timer(10.0, start_prewarm)
+    prewarm_timer.daemon = True
+    prewarm_timer.start()
     
     try:
         if browser_path:
@@ -898,7 +4666,7 @@ if __name__ == '__main__':
                      shutdown_delay=30.0,  # Allow 30 seconds for pending requests
                      close_callback=force_exit)
         else:
-            print("[App] No Chromium browser found, using default browser")
+            log.info("[App] No Chromium browser found, using default browser")
             eel.start('index.html', 
                      mode='default',
                      size=(800, 600),
@@ -1,14 +1,19 @@
 ﻿// ==================== GLOBAL STATE ====================
 let currentVideoInfo = null;
 let updateDownloadUrl = null;
+let updateSha256 = null;
 let updatePath = null;
 let isPlaylistDownload = false;
+let activeJobId = null;
 
 // ==================== INITIALIZATION ====================
 document.addEventListener('DOMContentLoaded', async function () {
     // Load saved settings
     await loadSettings();
 
+    // Page is up: lets the backend record startup time and warm up yt-dlp
+    eel.report_ui_ready();
+
     // Setup URL input event
     const urlInput = document.getElementById('urlInput');
     urlInput.addEventListener('paste', function () {
@@ -21,6 +26,9 @@ document.addEventListener('DOMContentLoaded', async function () {
     // Check for FFmpeg
     checkFFmpeg();
 
+    // Offer to continue downloads cut off when the app last closed
+    checkInterruptedJobs();
+
     // Check for updates silently
     setTimeout(() => checkForUpdates(true), 2000);
 
@@ -34,6 +42,25 @@ document.addEventListener('DOMContentLoaded', async function () {
     window.addEventListener('resize', resizeCanvas);
 });
 
+// ==================== INTERRUPTED DOWNLOADS ====================
+async function checkInterruptedJobs() {
+    try {
+        const jobs = await eel.get_interrupted_jobs()();
+        if (!jobs || jobs.length === 0) return;
+
+        const names = jobs.slice(0, 5).map(j => '• ' + j.url).join('\n');
+        const more = jobs.length > 5 ? `\n...and ${jobs.length - 5} more` : '';
+        if (confirm(`${jobs.length} download(s) did not finish last time:\n${names}${more}\n\nResume them now?`)) {
+            const resumed = await eel.resume_interrupted_jobs()();
+            showStatus(`Resumed ${resumed.length} download(s)`, 'success');
+        } else {
+            await eel.discard_interrupted_jobs()();
+        }
+    } catch (e) {
+        console.error('Interrupted job check failed:', e);
+    }
+}
+
 // ==================== FFMPEG MANAGEMENT ====================
 async function checkFFmpeg() {
     try {
@@ -235,6 +262,14 @@ async function handleUrlInput() {
     const url = urlInput.value.trim();
     if (!url) return;
 
+    // Several links pasted at once are fetched together
+    const urls = extractUrls(url);
+    if (urls.length > 1) {
+        handleBatchInput(urls);
+        return;
+    }
+    document.getElementById('batchSection').style.display = 'none';
+
     // Detect site immediately
     detectSite(url);
 
@@ -254,9 +289,15 @@ async function handleUrlInput() {
     videoSection.style.display = 'none';
     statusContainer.style.display = 'none';
 
+    // Stop loading entries of the previously shown playlist
+    if (currentVideoInfo && currentVideoInfo.stream_id) {
+        eel.close_playlist_stream(currentVideoInfo.stream_id)();
+    }
+
     try {
         console.log('[JS] Calling fetch_video_info...');
-        const info = await withTimeout(eel.fetch_video_info(url)(), 120000);  // 120 seconds for large playlists
+        // Playlists are streamed: entries arrive later through update_playlist_entries
+        const info = await withTimeout(eel.fetch_video_info(url, true)(), 120000);
         console.log('[JS] Got response:', info);
 
         if (info.success) {
@@ -329,7 +370,7 @@ function displayVideoInfo(info) {
     const thumbnail = document.getElementById('videoThumbnail');
     if (thumbnail) {
         if (info.thumbnail) {
-            thumbnail.src = info.thumbnail;
+            thumbnail.src = info.thumbnail_local || info.thumbnail;
             thumbnail.style.display = 'block';
         } else {
             thumbnail.src = 'data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 16 9"><rect fill="%23333" width="16" height="9"/></svg>';
@@ -359,17 +400,10 @@ function displayVideoInfo(info) {
     // Show playlist info and options if applicable
     const playlistInfo = document.getElementById('playlistInfo');
     const playlistModeOptions = document.getElementById('playlistModeOptions');
-    const playlistText = document.getElementById('playlistText');
 
-    if (info.is_playlist && info.playlist_count && info.playlist_count > 1) {
+    if (info.is_playlist && (info.stream_id || (info.playlist_count && info.playlist_count > 1))) {
         if (playlistInfo) playlistInfo.style.display = 'flex';
-        if (playlistText) {
-            if (info.is_mix) {
-                playlistText.textContent = `Mix: ${info.playlist_count} videos (showing up to 50)`;
-            } else {
-                playlistText.textContent = `Playlist: ${info.playlist_count} videos`;
-            }
-        }
+        updatePlaylistText();
         if (playlistModeOptions) playlistModeOptions.style.display = 'block';
     } else {
         if (playlistInfo) playlistInfo.style.display = 'none';
@@ -387,6 +421,70 @@ function displayVideoInfo(info) {
     }
 }
 
+function updatePlaylistText() {
+    const playlistText = document.getElementById('playlistText');
+    const info = currentVideoInfo;
+    if (!playlistText || !info) return;
+
+    const loading = info.stream_id && !info.stream_done;
+    // While streaming, show the loaded count (and the site's total when it reported one)
+    let count = info.playlist_count;
+    if (info.stream_id) {
+        count = info.entries.length + (loading && info.playlist_count > info.entries.length ? ` of ${info.playlist_count}` : '');
+    }
+    const suffix = loading ? ' (loading...)' : '';
+    if (info.is_mix) {
+        playlistText.textContent = `Mix: ${count} videos (showing up to 50)${suffix}`;
+    } else {
+        playlistText.textContent = `Playlist: ${count} videos${suffix}`;
+    }
+}
+
+// Pages of a streamed playlist pushed by the backend as yt-dlp reads them
+eel.expose(update_playlist_entries);
+function update_playlist_entries(streamId, entries, offset, done, total, error) {
+    const info = currentVideoInfo;
+    if (!info || info.stream_id !== streamId) return;
+
+    // Ignore pages already received (e.g. the final flush repeating the last page)
+    const fresh = entries.slice(Math.max(0, info.entries.length - offset));
+    info.entries.push(...fresh);
+    info.stream_done = done;
+    if (done) {
+        info.playlist_count = info.entries.length;
+    }
+    if (!info.thumbnail && fresh.length && fresh[0].thumbnail) {
+        info.thumbnail = fresh[0].thumbnail;
+        info.thumbnail_local = fresh[0].thumbnail_local;
+        document.getElementById('videoThumbnail').src = info.thumbnail_local || info.thumbnail;
+    }
+
+    updatePlaylistText();
+    const modal = document.getElementById('playlistModal');
+    if (modal && modal.style.display === 'flex') {
+        appendPlaylistItems(fresh);
+    }
+    if (error) {
+        showStatus('Stopped loading playlist: ' + error, 'error');
+    }
+}
+
+// Qualities of a streamed playlist, found by probing a few of its entries
+eel.expose(update_playlist_qualities);
+function update_playlist_qualities(streamId, qualities) {
+    const info = currentVideoInfo;
+    if (!info || info.stream_id !== streamId) return;
+
+    info.qualities = qualities;
+    const select = document.getElementById('qualitySelect');
+    const selected = select ? select.value : null;
+    updateQualityOptions();
+    // Keep the user's choice if the playlist offers it
+    if (select && selected && select.querySelector(`option[value="${selected}"]`)) {
+        select.value = selected;
+    }
+}
+
 function updateQualityOptions() {
     const mode = document.querySelector('input[name="downloadMode"]:checked').value;
     const select = document.getElementById('qualitySelect');
@@ -484,6 +582,7 @@ async function startDownload() {
             showStatus('Failed to start download', 'error');
             resetDownloadUI();
         }
+        activeJobId = result || null;
         // Reset selection after starting download
         selectedPlaylistIndices = null;
     } catch (e) {
@@ -495,7 +594,7 @@ async function startDownload() {
 
 async function cancelDownload() {
     try {
-        await eel.cancel_download()();
+        await eel.cancel_download(activeJobId)();
         showStatus('Download cancelled', 'info');
         resetDownloadUI();
     } catch (e) {
@@ -513,11 +612,105 @@ function resetDownloadUI() {
         playlistProgress.style.display = 'none';
     }
     isPlaylistDownload = false;
+    activeJobId = null;
+}
+
+// ==================== BATCH URLS ====================
+let currentBatchId = null;
+let batchResults = {}; // url -> info (as returned by fetch_video_info)
+let batchJobs = {}; // job id -> url of jobs queued from the batch list
+
+function extractUrls(text) {
+    return text.split(/[\s,]+/).filter(u => /^https?:\/\//i.test(u));
+}
+
+function batchRow(url) {
+    return document.querySelector(`.batch-item[data-url="${CSS.escape(url)}"]`);
+}
+
+function setBatchRow(url, status, state, title) {
+    const row = batchRow(url);
+    if (!row) return;
+    if (title) row.querySelector('.batch-item-title').textContent = title;
+    row.querySelector('.batch-item-status').textContent = status;
+    row.className = 'batch-item' + (state ? ' ' + state : '');
+}
+
+async function handleBatchInput(urls) {
+    if (currentBatchId) {
+        eel.cancel_info_batch(currentBatchId)();
+    }
+    document.getElementById('videoSection').style.display = 'none';
+    batchResults = {};
+
+    const batch = await eel.fetch_video_info_batch(urls)();
+    currentBatchId = batch.batch_id;
+
+    const list = document.getElementById('batchList');
+    list.innerHTML = '';
+    batch.urls.forEach(url => {
+        const row = document.createElement('div');
+        row.className = 'batch-item';
+        row.dataset.url = url;
+        row.innerHTML = `<span class="batch-item-title"></span><span class="batch-item-status">Fetching...</span>`;
+        row.querySelector('.batch-item-title').textContent = url;
+        list.appendChild(row);
+    });
+
+    document.getElementById('batchTitle').textContent = `${batch.urls.length} links` +
+        (batch.duplicates ? ` (${batch.duplicates} duplicates removed)` : '');
+    document.getElementById('batchCount').textContent = `0/${batch.urls.length} fetched`;
+    document.getElementById('batchDownloadBtn').disabled = true;
+    document.getElementById('batchSection').style.display = 'block';
+}
+
+// One URL of the current batch resolved (pushed by fetch_video_info_batch)
+eel.expose(update_batch_info);
+function update_batch_info(batchId, url, info, completed, total) {
+    if (batchId !== currentBatchId) return;
+    batchResults[url] = info;
+
+    if (info.success) {
+        const status = info.is_playlist ? `Playlist · ${info.playlist_count || info.entries.length} videos` : (info.duration || '');
+        setBatchRow(url, status, '', info.title);
+        document.getElementById('batchDownloadBtn').disabled = false;
+    } else {
+        setBatchRow(url, info.error || 'Failed', 'error');
+    }
+    document.getElementById('batchCount').textContent = `${completed}/${total} fetched`;
+}
+
+async function downloadBatch() {
+    const mode = document.getElementById('batchMode').value;
+    const quality = document.getElementById('batchQuality').value;
+    // Playlists are downloaded whole; everything else as a single video
+    const items = Object.entries(batchResults)
+        .filter(([url, info]) => info.success && !Object.values(batchJobs).includes(url))
+        .map(([url, info]) => ({ url, playlist_mode: info.is_playlist ? 'all' : 'single' }));
+    if (!items.length) return;
+
+    const jobs = await eel.start_download_batch(items, { mode, quality })();
+    jobs.forEach(job => {
+        batchJobs[job.job_id] = job.url;
+        setBatchRow(job.url, 'Queued', '');
+    });
+    showStatus(`${jobs.length} downloads queued`, 'success');
+}
+
+// Progress for queued jobs other than the one shown in the progress panel is ignored
+function isOtherJob(jobId) {
+    return jobId && activeJobId && jobId !== activeJobId;
 }
 
 // ==================== PROGRESS CALLBACKS ====================
 eel.expose(update_progress);
-function update_progress(percent, speed, eta, size) {
+function update_progress(percent, speed, eta, size, jobId) {
+    if (batchJobs[jobId]) {
+        setBatchRow(batchJobs[jobId], `${percent} · ${speed || '-'}`, '');
+        return;
+    }
+    if (isOtherJob(jobId)) return;
+
     // Parse percent
     let numPercent = parseFloat(percent.replace('%', '').trim()) || 0;
     numPercent = Math.min(100, Math.max(0, numPercent));
@@ -535,9 +728,17 @@ function update_progress(percent, speed, eta, size) {
     }
 }
 
+// Throttled progress from the backend: one call carries the latest update of every running job
+eel.expose(update_progress_batch);
+function update_progress_batch(updates) {
+    updates.forEach(u => update_progress(u.percent, u.speed, u.eta, u.size, u.job_id));
+}
+
 // Playlist progress callback
 eel.expose(update_playlist_progress);
-function update_playlist_progress(currentIndex, total, currentTitle, isDownloading) {
+function update_playlist_progress(currentIndex, total, currentTitle, isDownloading, jobId) {
+    if (batchJobs[jobId] || isOtherJob(jobId)) return;
+
     const playlistProgress = document.getElementById('playlistProgress');
     const countEl = document.getElementById('playlistProgressCount');
     const titleEl = document.getElementById('currentVideoTitle');
@@ -568,7 +769,13 @@ function update_playlist_progress(currentIndex, total, currentTitle, isDownloadi
 }
 
 eel.expose(download_complete);
-function download_complete(success, message) {
+function download_complete(success, message, jobId) {
+    if (batchJobs[jobId]) {
+        setBatchRow(batchJobs[jobId], success ? 'Done' : (message || 'Failed'), success ? 'done' : 'error');
+        return;
+    }
+    if (isOtherJob(jobId)) return;
+
     resetDownloadUI();
 
     if (success) {
@@ -611,32 +818,17 @@ async function checkForUpdates(silent = false) {
             updateBtn.innerHTML = '&#8987;<span class="update-badge" id="updateBadge"></span>';
         }
 
-        const result = await eel.check_for_updates()();
+        // Startup checks never wait on GitHub: a stale cache is refreshed in the
+        // background and the answer arrives through update_check_result
+        const result = silent
+            ? await eel.check_for_updates(true, false, true)()
+            : await eel.check_for_updates(true, true)();
 
         // Restore button
         updateBtn.innerHTML = '&#128260;<span class="update-badge" id="updateBadge"></span>';
 
         console.log('Update check result:', result);
-
-        if (result.success && result.update_available) {
-            document.getElementById('updateBadge').classList.add('active');
-            updateDownloadUrl = result.download_url;
-
-            const versionText = result.is_nightly
-                ? 'v' + result.current_version + ' \u2192 ' + result.latest_version
-                : 'v' + result.current_version + ' \u2192 v' + result.latest_version;
-            document.getElementById('updateVersionInfo').textContent = versionText;
-
-            if (!silent || !localStorage.getItem('updateDismissed_' + result.latest_version)) {
-                showUpdateModal();
-            }
-        } else if (!silent) {
-            if (result.success) {
-                showStatus('You have the latest version!', 'success');
-            } else {
-                showStatus('Failed to check for updates', 'error');
-            }
-        }
+        handleUpdateResult(result, silent);
     } catch (e) {
         console.error('Update check failed:', e);
         document.getElementById('updateBtn').innerHTML = '&#128260;<span class="update-badge" id="updateBadge"></span>';
@@ -646,6 +838,37 @@ async function checkForUpdates(silent = false) {
     }
 }
 
+eel.expose(update_check_result);
+function update_check_result(result) {
+    console.log('Background update check result:', result);
+    handleUpdateResult(result, true);
+}
+
+function handleUpdateResult(result, silent) {
+    if (result.pending) return;
+
+    if (result.success && result.update_available) {
+        document.getElementById('updateBadge').classList.add('active');
+        updateDownloadUrl = result.download_url;
+        updateSha256 = result.sha256 || null;
+
+        const versionText = result.is_nightly
+            ? 'v' + result.current_version + ' \u2192 ' + result.latest_version
+            : 'v' + result.current_version + ' \u2192 v' + result.latest_version;
+        document.getElementById('updateVersionInfo').textContent = versionText;
+
+        if (!silent || !localStorage.getItem('updateDismissed_' + result.latest_version)) {
+            showUpdateModal();
+        }
+    } else if (!silent) {
+        if (result.success) {
+            showStatus('You have the latest version!', 'success');
+        } else {
+            showStatus('Failed to check for updates', 'error');
+        }
+    }
+}
+
 function showUpdateModal() {
     document.getElementById('updateModal').classList.add('active');
     document.getElementById('updateProgress').style.display = 'none';
@@ -670,7 +893,7 @@ async function downloadAndInstallUpdate() {
     document.getElementById('updateStatus').textContent = 'Downloading update...';
 
     try {
-        await eel.download_update(updateDownloadUrl)();
+        await eel.download_update(updateDownloadUrl, updateSha256)();
     } catch (e) {
         console.error('Update download failed:', e);
         showStatus('Update failed: ' + e.message, 'error');
@@ -714,27 +937,41 @@ function openPlaylistModal() {
         return;
     }
 
-    // Clear previous content
+    // Clear previous content and selection
     playlistList.innerHTML = '';
+    document.getElementById('selectAllCheckbox').checked = false;
 
-    // Populate with playlist entries (with thumbnails)
-    currentVideoInfo.entries.forEach((entry, index) => {
+    // Populate with playlist entries (with thumbnails); streamed entries are appended as they arrive
+    appendPlaylistItems(currentVideoInfo.entries);
+
+    // Show modal
+    modal.style.display = 'flex';
+}
+
+function appendPlaylistItems(entries) {
+    const playlistList = document.getElementById('playlistList');
+    const selectAll = document.getElementById('selectAllCheckbox');
+    const fragment = document.createDocumentFragment();
+    const start = playlistList.children.length;
+
+    entries.forEach((entry, i) => {
+        const index = start + i;
         const item = document.createElement('div');
         item.className = 'playlist-item';
         const title = entry.title || 'Unknown';
         const num = index + 1;
-        const thumbnail = entry.thumbnail || '';
+        const thumbnail = entry.thumbnail_local || entry.thumbnail || '';
         const duration = entry.duration_str || '';
         const uploader = entry.uploader || '';
         const originalIndex = entry.original_index !== undefined ? entry.original_index : index;
 
         item.innerHTML = `
             <label class="checkbox-container">
-                <input type="checkbox" class="playlist-checkbox" data-index="${index}" data-original-index="${originalIndex}" onchange="updateSelectionCount()">
+                <input type="checkbox" class="playlist-checkbox" data-index="${index}" data-original-index="${originalIndex}" onchange="updateSelectionCount()"${selectAll && selectAll.checked ? ' checked' : ''}>
                 <span class="checkmark"></span>
             </label>
             <div class="playlist-item-thumb">
-                <img src="${thumbnail}" alt="" onerror="this.style.display='none'">
+                <img src="${thumbnail}" alt="" loading="lazy" onerror="this.style.display='none'">
                 ${duration ? `<span class="playlist-item-duration">${duration}</span>` : ''}
             </div>
             <div class="playlist-item-info">
@@ -742,15 +979,11 @@ function openPlaylistModal() {
                 ${uploader ? `<span class="playlist-item-uploader">${uploader}</span>` : ''}
             </div>
         `;
-        playlistList.appendChild(item);
+        fragment.appendChild(item);
     });
 
-    // Reset selection count
-    document.getElementById('selectAllCheckbox').checked = false;
+    playlistList.appendChild(fragment);
     updateSelectionCount();
-
-    // Show modal
-    modal.style.display = 'flex';
 }
 
 function closePlaylistModal() {